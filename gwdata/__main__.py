@@ -0,0 +1,212 @@
+# Headless access to the tracker data, without importing Qt:
+#   python -m gwdata report <character> [--json]
+#   python -m gwdata titles
+#   python -m gwdata history <character> [--weekly] [--areas]
+#   python -m gwdata export <character> [file] [--format csv|json]
+#   python -m gwdata import <character> <file> [--format csv|json] [--dry-run]
+
+import os
+import sys
+import json
+import argparse
+
+from .consts import DATA_BASE
+from .cache import CatalogCache
+from .catalog import CATALOG_BASE, loadCatalog
+from .chardb import findChar, openCharDb, openCharDbReadOnly, isCharOpen, listChars
+from .titles import TitleScanner, accountTitles
+from .history import loadTimeline, campaignCounts
+from .transfer import TRANSFER_FORMATS, TransferError, transferFormat, exportStatus, importStatus
+from .progress import *
+
+
+def loadAreas():
+    cache = None
+    if os.path.isdir(DATA_BASE):
+        cache = CatalogCache(os.path.join(DATA_BASE, 'catalog.cache'))
+    return loadCatalog(CATALOG_BASE, cache)
+
+def openChar(charName, readOnly=True):
+    # Read-only commands see changes still in the journal without writing
+    # them; commands which write refuse to run while the GUI has the
+    # character open, since it wouldn't see their changes
+    fileName = findChar(DATA_BASE, charName) if os.path.isdir(DATA_BASE) else None
+    if fileName is None:
+        print("Error: No character named {!r} in {}".format(charName, DATA_BASE), file=sys.stderr)
+        sys.exit(1)
+    if not readOnly and isCharOpen(fileName):
+        print("Error: {!r} is open in gwtrack (or has changes left by a crash);"
+              " close it in gwtrack first".format(charName), file=sys.stderr)
+        sys.exit(1)
+    try:
+        if readOnly:
+            return openCharDbReadOnly(fileName)
+        return openCharDb(fileName)
+    except RuntimeError as err:
+        print("Error: {}".format(err), file=sys.stderr)
+        sys.exit(1)
+
+def formatRow(name, done, total, width):
+    return "{:<{}}  {:>5} / {:<5} {:6.1f}%".format(name, width, done, total,
+                                                  percent(done, total))
+
+def printTables(progress, campaigns):
+    width = max(len(entry.area.name) + len(STATUS_TITLES[entry.status]) + 3
+                for entry in progress)
+    print("Areas")
+    for entry in sorted(progress, key=lambda e: (STATUS_TITLES[e.status], e.area.name)):
+        name = "{} - {}".format(STATUS_TITLES[entry.status], entry.area.name)
+        print("  " + formatRow(name, entry.done, entry.total, width))
+
+    print()
+    print("Campaigns")
+    for campaign in sorted(campaigns):
+        for status in sorted(campaigns[campaign], key=lambda s: STATUS_TITLES[s]):
+            done, total = campaigns[campaign][status]
+            name = "{} - {}".format(campaign, STATUS_TITLES[status])
+            print("  " + formatRow(name, done, total, width))
+
+def printJson(progress, campaigns):
+    report = {
+        'areas': [{
+            'area': entry.area.name,
+            'campaign': areaCampaign(entry.area),
+            'type': STATUS_TITLES[entry.status],
+            'done': entry.done,
+            'total': entry.total,
+        } for entry in progress],
+        'campaigns': [{
+            'campaign': campaign,
+            'type': STATUS_TITLES[status],
+            'done': counts[0],
+            'total': counts[1],
+        } for campaign in sorted(campaigns)
+          for status, counts in campaigns[campaign].items()],
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+def report(args):
+    areas = loadAreas()
+    db = openChar(args.character)
+    try:
+        progress = loadProgress(db, areas)
+    finally:
+        db.close()
+
+    campaigns = campaignProgress(progress)
+    if args.json:
+        printJson(progress, campaigns)
+    else:
+        printTables(progress, campaigns)
+
+def titles(args):
+    areas = loadAreas()
+    fileNames = [os.path.join(DATA_BASE, char[2]) for char in listChars(DATA_BASE)] \
+                if os.path.isdir(DATA_BASE) else []
+    try:
+        chars = TitleScanner().scan(fileNames)
+    except RuntimeError as err:
+        print("Error: {}".format(err), file=sys.stderr)
+        sys.exit(1)
+
+    progress = accountTitles(areas, chars)
+    width = max(len(entry.title) + len(entry.area.name) + 3 for entry in progress)
+    for entry in progress:
+        name = "{} - {}".format(entry.title, entry.area.name)
+        print(formatRow(name, entry.done(), entry.total(), width))
+        for charName, count in sorted(entry.charCounts().items(), key=lambda c: -c[1]):
+            print("    {:<{}}  {:>5}".format(charName, width - 2, count))
+
+def history(args):
+    areas = loadAreas()
+    db = openChar(args.character)
+    try:
+        timeline = loadTimeline(db, args.weekly)
+    finally:
+        db.close()
+
+    for start, counts in timeline:
+        print("{}{}  {:>5}".format("Week of " if args.weekly else "", start.isoformat(),
+                                   sum(counts.values())))
+        if args.areas:
+            groups = {"{} - {}".format(STATUS_TITLES[status], areaName): done
+                      for (status, areaName), done in counts.items()}
+        else:
+            groups = campaignCounts(counts, areas)
+        for name in sorted(groups):
+            print("    {:<40} {:>5}".format(name, groups[name]))
+
+def exportChar(args):
+    db = openChar(args.character)
+    try:
+        if args.file is None or args.file == '-':
+            count = exportStatus(db, sys.stdout, args.format or 'csv')
+        else:
+            with open(args.file, 'w', encoding='utf-8', newline='') as outFile:
+                count = exportStatus(db, outFile, transferFormat(args.file, args.format))
+    except (OSError, TransferError) as err:
+        print("Error: {}".format(err), file=sys.stderr)
+        sys.exit(1)
+    finally:
+        db.close()
+    print("Exported {} statuses".format(count), file=sys.stderr)
+
+def importChar(args):
+    areas = loadAreas()
+    db = openChar(args.character, readOnly=args.dry_run)
+    try:
+        with open(args.file, 'r', encoding='utf-8', newline='') as inFile:
+            result = importStatus(db, inFile, transferFormat(args.file, args.format), areas,
+                                  args.dry_run)
+    except (OSError, TransferError) as err:
+        print("Error: {}".format(err), file=sys.stderr)
+        sys.exit(1)
+    finally:
+        db.close()
+
+    for recordNum, message in result.problems:
+        print("{}:{}: {}".format(args.file, recordNum, message), file=sys.stderr)
+    if result.skipped > len(result.problems):
+        print("... and {} more".format(result.skipped - len(result.problems)), file=sys.stderr)
+    print("{} {} statuses, skipped {}".format("Checked" if args.dry_run else "Imported",
+                                              result.imported, result.skipped))
+    if result.skipped:
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m gwdata')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    reportCmd = commands.add_parser('report', help="Print a character's completion")
+    reportCmd.add_argument('character', help="Character name or database file")
+    reportCmd.add_argument('--json', action='store_true', help="Output JSON instead of tables")
+    reportCmd.set_defaults(func=report)
+
+    titlesCmd = commands.add_parser('titles', help="Print title progress across all characters")
+    titlesCmd.set_defaults(func=titles)
+
+    historyCmd = commands.add_parser('history', help="Print what a character finished over time")
+    historyCmd.add_argument('character', help="Character name or database file")
+    historyCmd.add_argument('--weekly', action='store_true', help="Group by week instead of day")
+    historyCmd.add_argument('--areas', action='store_true', help="Break down by area instead of campaign")
+    historyCmd.set_defaults(func=history)
+
+    exportCmd = commands.add_parser('export', help="Write a character's statuses to CSV or JSON")
+    exportCmd.add_argument('character', help="Character name or database file")
+    exportCmd.add_argument('file', nargs='?', help="Output file (default: standard output)")
+    exportCmd.add_argument('--format', choices=TRANSFER_FORMATS,
+                           help="Output format (default: from the file extension)")
+    exportCmd.set_defaults(func=exportChar)
+
+    importCmd = commands.add_parser('import', help="Read a character's statuses from CSV or JSON")
+    importCmd.add_argument('character', help="Character name or database file")
+    importCmd.add_argument('file', help="Input file")
+    importCmd.add_argument('--format', choices=TRANSFER_FORMATS,
+                           help="Input format (default: from the file extension)")
+    importCmd.add_argument('--dry-run', action='store_true', help="Only check the file")
+    importCmd.set_defaults(func=importChar)
+
+    args = parser.parse_args()
+    args.func(args)
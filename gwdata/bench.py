@@ -0,0 +1,290 @@
+import os
+import sys
+import yaml
+import time
+import random
+import shutil
+import tempfile
+import tracemalloc
+
+from .quests import QuestArea
+from .missions import MissionArea
+from .skills import SkillArea
+from .vanquish import VanquishArea
+from .consts import REWARD_MAX
+from .search import SearchIndex, areaItems
+from .status import STATE_NAMES, STATUS_MISSION, STATUS_MISSION_HM, STATUS_VANQUISH, statusKey
+from .chardb import createCharDb, openCharDb, CharSession, CharPool
+from .progress import ProgressTracker, FINISHED_STATES, areaStatuses
+from .ranks import RankCalculator
+from .history import saveStatusChanges
+from . import catalog as gwcatalog
+from . import rewards
+
+# Key holding the per-item entries for each area type
+LIST_KEYS = {
+    QuestArea:      'Quests',
+    MissionArea:    'Missions',
+    SkillArea:      'Skills',
+    VanquishArea:   'Explorable Areas',
+}
+
+
+def loadCatalogInfo(baseDir):
+    catalog = []
+    for fileName, areaClass in gwcatalog.catalogFiles(baseDir):
+        with open(fileName, 'rb') as af:
+            info = yaml.load(af, Loader=gwcatalog.SafeLoader)
+        name = os.path.basename(fileName).replace('.yaml', '')
+        catalog.append((areaClass, LIST_KEYS[areaClass], info, name))
+    return catalog
+
+def syntheticCatalog(catalog, scale):
+    # Each copy gets uniquely named items, like a catalog `scale` times the
+    # size of the shipped one would.
+    for copy in range(scale):
+        for areaClass, listKey, info, name in catalog:
+            copyInfo = dict(info)
+            items = info.get(listKey) or {}
+            copyInfo[listKey] = {"{} #{}".format(item, copy): items[item] for item in items}
+            yield areaClass(copyInfo, "{} #{}".format(name, copy))
+
+
+class LegacyInfo:
+    pass
+
+def unshared(value):
+    # YAML hands out a new string object for every occurrence of a value
+    if isinstance(value, str):
+        return value.encode('utf-8').decode('utf-8')
+    return value
+
+def legacyCopy(info):
+    # Rebuild the previous layout: a __dict__ per item, with rewards stored
+    # as a list of bools.
+    legacy = LegacyInfo()
+    for slot in type(info).__slots__:
+        value = getattr(info, slot)
+        if slot == 'reward':
+            value = [rewards.hasReward(value, idx) for idx in range(REWARD_MAX)]
+        elif slot not in ('name', 'wiki'):
+            value = unshared(value)
+        setattr(legacy, slot, value)
+    return legacy
+
+def memoryBench(baseDir, scale):
+    catalog = loadCatalogInfo(baseDir)
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    areas = list(syntheticCatalog(catalog, scale))
+    current = tracemalloc.get_traced_memory()[0] - base
+    itemCount = sum(len(areaItems(area)) for area in areas)
+
+    base = tracemalloc.get_traced_memory()[0]
+    legacy = [[legacyCopy(info) for info in areaItems(area)] for area in areas]
+    legacyExtra = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    # The legacy copies share the name and wiki strings with the current
+    # objects, so add those back to get a comparable total.
+    shared = sum(sys.getsizeof(info.name) + sys.getsizeof(info.wiki)
+                 for area in areas for info in areaItems(area))
+    legacyTotal = legacyExtra + shared
+
+    print("Synthetic catalog: {} areas, {} items ({}x)".format(len(areas), itemCount, scale))
+    print("  __dict__ + reward list:  {:10.1f} MiB".format(legacyTotal / 1048576))
+    print("  __slots__ + bitmask:     {:10.1f} MiB".format(current / 1048576))
+    print("  Reduction:               {:10.1f} %".format(100.0 * (legacyTotal - current) / legacyTotal))
+    del legacy
+
+
+def searchBench(baseDir, scale):
+    areas = list(syntheticCatalog(loadCatalogInfo(baseDir), scale))
+    index = SearchIndex()
+    start = time.perf_counter()
+    for area in areas:
+        index.addArea(area)
+    index.prepare()
+    buildTime = time.perf_counter() - start
+    itemCount = sum(len(areaItems(area)) for area in areas)
+
+    # Type each query one character at a time, like the search box does
+    queries = ["Monk", "Vizunah", "mesmer's burden", "Zen Daijun", "Wilderness",
+               "Kryta", "xyzzy", "a", "The Eternal Grove"]
+    timings = []
+    unfinished = 0
+    for rep in range(5):
+        for query in queries:
+            for length in range(1, len(query) + 1):
+                start = time.perf_counter()
+                index.search(query[:length])
+                timings.append(time.perf_counter() - start)
+                unfinished += not index.isComplete()
+    timings.sort()
+
+    print("Synthetic catalog: {} areas, {} items ({}x)".format(len(areas), itemCount, scale))
+    print("  Index build:             {:10.1f} ms".format(buildTime * 1000))
+    print("  Keystrokes timed:        {:10d}".format(len(timings)))
+    print("  Mean per keystroke:      {:10.3f} ms".format(1000 * sum(timings) / len(timings)))
+    print("  99th percentile:         {:10.3f} ms".format(1000 * timings[len(timings) * 99 // 100]))
+    print("  Max per keystroke:       {:10.3f} ms".format(1000 * timings[-1]))
+    print("  Left for idle time:      {:10d}".format(unfinished))
+
+
+def timeLoad(func, repeat=3):
+    best = None
+    for rep in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def loaderBench(baseDir, scale):
+    # Parse the catalog `scale` times over, serially with each loader and
+    # through the process pool
+    files = gwcatalog.catalogFiles(baseDir) * scale
+
+    def serial(loader):
+        return lambda: [gwcatalog.parseArea(f, cls, loader) for f, cls in files]
+
+    print("Catalog: {} files ({}x), {} CPUs".format(len(files), scale, os.cpu_count()))
+    pureTime = timeLoad(serial(yaml.SafeLoader))
+    print("  Serial, SafeLoader:      {:10.1f} ms".format(pureTime * 1000))
+    if gwcatalog.SafeLoader is not yaml.SafeLoader:
+        print("  Serial, CSafeLoader:     {:10.1f} ms".format(
+              timeLoad(serial(gwcatalog.SafeLoader)) * 1000))
+    else:
+        print("  Serial, CSafeLoader:     (libyaml not available)")
+    workers = max(2, min(os.cpu_count() or 1, gwcatalog.POOL_MAX_WORKERS))
+    print("  Process pool ({:2d} procs):  {:10.1f} ms".format(
+          workers, timeLoad(lambda: gwcatalog.poolParseAreas(files, workers)) * 1000))
+
+
+def randomStatus(areas, fraction):
+    changes = []
+    for area in areas:
+        for status in areaStatuses(area):
+            for info in areaItems(area):
+                if random.random() < fraction:
+                    changes.append((statusKey(status, area.name, info.name),
+                                    random.choice(STATE_NAMES[1:])))
+    return changes
+
+def switchBench(baseDir, scale):
+    # Alternates between two characters `scale` times, doing the database
+    # work the GUI does when a character is selected
+    areas = gwcatalog.loadCatalog(baseDir)
+    area = max(areas, key=lambda a: len(areaItems(a)))
+    kinds = areaStatuses(area)
+    tracker = ProgressTracker()
+    for catalogArea in areas:
+        tracker.addArea(catalogArea)
+
+    tempDir = tempfile.mkdtemp()
+    try:
+        fileNames = []
+        for idx in range(2):
+            fileName = os.path.join(tempDir, 'char{}.db'.format(idx))
+            createCharDb(fileName, 'Char {}'.format(idx), 'Tyrian', 'Monk', 'Ranger')
+            db = openCharDb(fileName)
+            saveStatusChanges(db, randomStatus(areas, 0.5))
+            db.commit()
+            db.close()
+            fileNames.append(fileName)
+
+        def reopen(fileName):
+            session = CharSession(fileName)
+            session.areaStatus(kinds, area.name)
+            tracker.load(session.db)
+            session.close()
+
+        pool = CharPool()
+        def pooled(fileName):
+            session = pool.open(fileName)
+            session.areaStatus(kinds, area.name)
+            if session.progress is None:
+                tracker.load(session.db)
+                session.progress = tracker.counts
+            else:
+                tracker.counts = session.progress
+
+        print("Switching between 2 characters {} times ({}, {} items)".format(
+              scale, area.name, len(areaItems(area))))
+        for title, switch in (("Reopen on every switch:", reopen), ("Connection pool:", pooled)):
+            timings = []
+            for rep in range(scale):
+                start = time.perf_counter()
+                switch(fileNames[rep % 2])
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            print("  {:24s} mean {:8.3f} ms, median {:8.3f} ms, max {:8.3f} ms".format(
+                  title, 1000 * sum(timings) / len(timings), 1000 * timings[len(timings) // 2],
+                  1000 * timings[-1]))
+        pool.close()
+    finally:
+        shutil.rmtree(tempDir)
+
+def ranksBench(baseDir, scale):
+    # Totals the remaining rank rewards over a catalog `scale` times the
+    # size of the shipped one, column-wise and item by item
+    catalog = [entry for entry in loadCatalogInfo(baseDir)
+               if entry[0] in (MissionArea, VanquishArea)]
+    areas = list(syntheticCatalog(catalog, scale))
+    calc = RankCalculator()
+    for area in areas:
+        calc.addArea(area)
+    status = calc.newStatus()
+    states = dict(randomStatus(areas, 0.5))
+    for key, state in states.items():
+        calc.update(status, key, state)
+
+    def finished(status, areaName, info):
+        key = statusKey(status, areaName, info.name)
+        return states.get(key, '') in FINISHED_STATES[key[0], key[3]]
+
+    def itemwise():
+        ranks = {}
+        for area in areas:
+            if isinstance(area, MissionArea):
+                for info in area.missions:
+                    nm = finished(STATUS_MISSION, area.name, info)
+                    hm = finished(STATUS_MISSION_HM, area.name, info)
+                    points = ranks.setdefault(info.rank_type, [0, 0, 0])
+                    if not nm:
+                        points[0] += info.rank
+                    if not hm:
+                        points[1] += info.hm_rank
+                    if not nm and not hm:
+                        points[2] += info.z_rank
+            else:
+                for info in area.areas:
+                    if not finished(STATUS_VANQUISH, area.name, info):
+                        ranks.setdefault(info.z_rank_type, [0, 0, 0])[2] += info.z_rank
+        return ranks
+
+    print("Remaining rank rewards for {} items".format(calc.size()))
+    for title, func in (("Item by item:", itemwise),
+                        ("Columns:", lambda: calc.totals(status))):
+        elapsed = timeLoad(func, repeat=20)
+        print("  {:24s} {:8.3f} ms".format(title, 1000 * elapsed))
+
+
+BENCHMARKS = {
+    'loader':   (loaderBench, 1),
+    'memory':   (memoryBench, 100),
+    'ranks':    (ranksBench, 100),
+    'search':   (searchBench, 100),
+    'switch':   (switchBench, 200),
+}
+
+if __name__ == '__main__':
+    baseDir = gwcatalog.CATALOG_BASE
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print("Usage: python -m gwdata.bench {{{}}} [scale]".format('|'.join(sorted(BENCHMARKS))))
+        sys.exit(1)
+    bench, scale = BENCHMARKS[sys.argv[1]]
+    if len(sys.argv) > 2:
+        scale = int(sys.argv[2])
+    bench(baseDir, scale)
@@ -0,0 +1,70 @@
+import os
+import pickle
+import hashlib
+
+# Bump this whenever the layout of the gwdata area/info classes changes, so
+# stale pickled objects are never handed back to the GUI.
+CACHE_VERSION = 5
+
+
+class CatalogCache:
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.entries = {}
+        self.misses = {}
+        self.seen = set()
+        self.dirty = False
+
+        try:
+            with open(fileName, 'rb') as cf:
+                version, entries = pickle.load(cf)
+            if version == CACHE_VERSION:
+                self.entries = entries
+        except Exception:
+            # Missing, truncated or otherwise unusable cache -- just rebuild it
+            self.dirty = True
+
+    def lookup(self, fileName):
+        key = os.path.abspath(fileName)
+        self.seen.add(key)
+        st = os.stat(fileName)
+
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[3]
+
+        # The timestamp changed, but the content may not have (e.g. a fresh
+        # checkout), so only report a miss if the hash doesn't match either.
+        with open(fileName, 'rb') as af:
+            digest = hashlib.sha1(af.read()).hexdigest()
+        if entry is not None and entry[2] == digest:
+            self.entries[key] = (st.st_mtime_ns, st.st_size, digest, entry[3])
+            self.dirty = True
+            return entry[3]
+
+        self.misses[key] = (st.st_mtime_ns, st.st_size, digest)
+        return None
+
+    def store(self, fileName, area):
+        key = os.path.abspath(fileName)
+        mtime, size, digest = self.misses.pop(key)
+        self.entries[key] = (mtime, size, digest, area)
+        self.dirty = True
+
+    def save(self):
+        # Forget files which no longer exist in the catalog
+        for key in list(self.entries.keys()):
+            if key not in self.seen:
+                del self.entries[key]
+                self.dirty = True
+        if not self.dirty:
+            return
+
+        tempName = self.fileName + '.tmp'
+        try:
+            with open(tempName, 'wb') as cf:
+                pickle.dump((CACHE_VERSION, self.entries), cf, pickle.HIGHEST_PROTOCOL)
+            os.replace(tempName, self.fileName)
+            self.dirty = False
+        except OSError as err:
+            print("Warning: Could not write catalog cache: {}".format(err))
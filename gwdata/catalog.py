@@ -0,0 +1,77 @@
+import os
+import yaml
+import concurrent.futures
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    # libyaml isn't available; fall back to the pure Python loader
+    from yaml import SafeLoader
+
+from .quests import QuestArea
+from .missions import MissionArea
+from .skills import SkillArea
+from .vanquish import VanquishArea
+
+CATALOG_DIRS = [
+    ('quests',      QuestArea),
+    ('missions',    MissionArea),
+    ('skills',      SkillArea),
+    ('vanquish',    VanquishArea),
+]
+
+# The catalog YAML directories live next to the gwdata package
+CATALOG_BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Below this many files to parse, starting worker processes costs more
+# than it saves.  Starting a pool and sending the areas back costs about
+# 60 ms, while libyaml parses a file in about 1.5 ms (the pure Python
+# loader takes about 12 ms).
+POOL_MIN_FILES = 200 if SafeLoader is not yaml.SafeLoader else 16
+POOL_MAX_WORKERS = 4
+
+
+def catalogFiles(baseDir):
+    files = []
+    for dirName, areaClass in CATALOG_DIRS:
+        path = os.path.join(baseDir, dirName)
+        for fileName in sorted(os.listdir(path)):
+            if fileName.endswith('.yaml'):
+                files.append((os.path.join(path, fileName), areaClass))
+    return files
+
+def parseArea(fileName, areaClass, loader=SafeLoader):
+    with open(fileName, 'rb') as af:
+        info = yaml.load(af, Loader=loader)
+    if 'Name' in info:
+        area_name = info['Name']
+    else:
+        area_name = os.path.basename(fileName).replace('.yaml', '')
+    return areaClass(info, area_name)
+
+def parseAreas(files, workers=None):
+    if workers is None:
+        workers = min(os.cpu_count() or 1, POOL_MAX_WORKERS)
+    if workers < 2 or len(files) < POOL_MIN_FILES:
+        return [parseArea(fileName, areaClass) for fileName, areaClass in files]
+    return poolParseAreas(files, workers)
+
+def poolParseAreas(files, workers):
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(parseArea, [f[0] for f in files], [f[1] for f in files],
+                             chunksize=max(1, len(files) // (workers * 4))))
+
+def loadCatalog(baseDir, cache=None, workers=None):
+    files = catalogFiles(baseDir)
+    if cache is None:
+        return parseAreas(files, workers)
+
+    # Only files missing from (or changed since) the cache are parsed
+    areas = [cache.lookup(fileName) for fileName, areaClass in files]
+    missing = [idx for idx, area in enumerate(areas) if area is None]
+    parsed = parseAreas([files[idx] for idx in missing], workers)
+    for idx, area in zip(missing, parsed):
+        cache.store(files[idx][0], area)
+        areas[idx] = area
+    cache.save()
+    return areas
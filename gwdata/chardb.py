@@ -0,0 +1,397 @@
+import os
+import json
+import sqlite3
+import collections
+import urllib.request
+from .status import *
+from .history import HISTORY_SCHEMA, saveStatusChanges
+from .undo import UNDO_SCHEMA, UndoStack
+
+CHAR_DB_VERSION = 4
+
+# Name and type of every character, so listing characters doesn't need to
+# open each database.  Entries are checked against the file's mtime and size.
+ROSTER_FILE = 'roster.json'
+ROSTER_VERSION = 1
+
+# Number of characters kept open for fast switching
+CHAR_POOL_SIZE = 4
+
+STATUS_SCHEMA = [
+    "CREATE TABLE status (kind INTEGER NOT NULL, area TEXT NOT NULL,"
+    " item TEXT NOT NULL, mode INTEGER NOT NULL DEFAULT 0,"
+    " state INTEGER NOT NULL DEFAULT 0,"
+    " PRIMARY KEY (kind, area, item, mode)) WITHOUT ROWID",
+    "CREATE INDEX status_kind_state ON status (kind, state, area)",
+]
+
+
+def createCharDb(fileName, name, charType, profession, profession2):
+    db = sqlite3.connect(fileName)
+    csr = db.cursor()
+    csr.execute("CREATE TABLE config (key TEXT, value TEXT)")
+    for statement in STATUS_SCHEMA + HISTORY_SCHEMA + UNDO_SCHEMA:
+        csr.execute(statement)
+    csr.execute("INSERT INTO config (key, value) VALUES ('Version', ?)", (str(CHAR_DB_VERSION),))
+    csr.execute("INSERT INTO config (key, value) VALUES ('Name', ?)", (name,))
+    csr.execute("INSERT INTO config (key, value) VALUES ('Type', ?)", (charType,))
+    csr.execute("INSERT INTO config (key, value) VALUES ('Profession1', ?)", (profession,))
+    csr.execute("INSERT INTO config (key, value) VALUES ('Profession2', ?)", (profession2,))
+    db.commit()
+    db.close()
+    updateRoster(os.path.dirname(fileName), [fileName])
+
+def readCharInfo(fileName):
+    db = sqlite3.connect(fileName)
+    try:
+        csr = db.cursor()
+        csr.execute("SELECT value FROM config WHERE key='Name'")
+        name = csr.fetchone()[0]
+        csr.execute("SELECT value FROM config WHERE key='Type'")
+        charType = csr.fetchone()[0]
+    finally:
+        db.close()
+    return (name, charType)
+
+def loadRoster(dataBase):
+    try:
+        with open(os.path.join(dataBase, ROSTER_FILE), 'r', encoding='utf-8') as rf:
+            roster = json.load(rf)
+        if roster.get('Version') == ROSTER_VERSION:
+            return roster['Chars']
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return {}
+
+def saveRoster(dataBase, chars):
+    rosterName = os.path.join(dataBase, ROSTER_FILE)
+    tempName = rosterName + '.tmp'
+    try:
+        with open(tempName, 'w', encoding='utf-8') as rf:
+            json.dump({'Version': ROSTER_VERSION, 'Chars': chars}, rf)
+        os.replace(tempName, rosterName)
+    except OSError as err:
+        print("Warning: Could not write character roster: {}".format(err))
+
+def rosterEntry(fileName):
+    name, charType = readCharInfo(fileName)
+    # Stat after reading, since closing the database can checkpoint it
+    st = os.stat(fileName)
+    return [st.st_mtime_ns, st.st_size, name, charType]
+
+def updateRoster(dataBase, fileNames):
+    chars = loadRoster(dataBase)
+    for fileName in fileNames:
+        chars[os.path.basename(fileName)] = rosterEntry(fileName)
+    saveRoster(dataBase, chars)
+
+def listChars(dataBase):
+    # Returns (name, type, file name) for each character, sorted by name
+    roster = loadRoster(dataBase)
+    chars = {}
+    for entry in os.scandir(dataBase):
+        if not entry.name.endswith('.db'):
+            continue
+        st = entry.stat()
+        cached = roster.get(entry.name)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            chars[entry.name] = cached
+        else:
+            chars[entry.name] = rosterEntry(entry.path)
+    if chars != roster:
+        saveRoster(dataBase, chars)
+    return sorted(((info[2], info[3], fileName) for fileName, info in chars.items()),
+                  key=lambda c: c[0].lower())
+
+def findChar(dataBase, charName):
+    # Accepts either the character's name or its database file name
+    charName = charName.lower()
+    for name, charType, fileName in listChars(dataBase):
+        if charName in (name.lower(), fileName.lower(), fileName[:-3].lower()):
+            return os.path.join(dataBase, fileName)
+    return None
+
+def openCharDb(fileName):
+    db = sqlite3.connect(fileName)
+    csr = db.cursor()
+    csr.execute("PRAGMA journal_mode=WAL")
+    csr.execute("PRAGMA synchronous=NORMAL")
+    upgradeCharDb(db, charDbVersion(db))
+    return db
+
+def openCharDbReadOnly(fileName):
+    # Opens a character without writing to it, e.g. while the GUI has it
+    # open.  Older databases and changes still in the journal are applied
+    # to an in-memory copy instead.
+    url = 'file:{}?mode=ro'.format(urllib.request.pathname2url(os.path.abspath(fileName)))
+    db = sqlite3.connect(url, uri=True)
+    dbver = charDbVersion(db)
+    if dbver == CHAR_DB_VERSION and not hasPendingChanges(fileName):
+        return db
+    copy = sqlite3.connect(':memory:')
+    try:
+        db.backup(copy)
+    finally:
+        db.close()
+    upgradeCharDb(copy, dbver)
+    replayJournal(copy, fileName + '.pending')
+    return copy
+
+def isCharOpen(fileName):
+    # The GUI keeps a journal for each open character, deleting it on close.
+    # One left behind by a crash is replayed the next time it's opened.
+    return os.path.exists(fileName + '.pending')
+
+def hasPendingChanges(fileName):
+    # True if the character has changes in its journal which haven't been
+    # written to the database, either because it's open in the GUI or
+    # because the GUI crashed
+    journalName = fileName + '.pending'
+    return os.path.exists(journalName) and os.path.getsize(journalName) > 0
+
+def charDbVersion(db):
+    csr = db.cursor()
+    csr.execute("SELECT value FROM config WHERE key='Version'")
+    dbver = int(csr.fetchone()[0])
+    if dbver > CHAR_DB_VERSION:
+        db.close()
+        raise RuntimeError("Character version too new")
+    return dbver
+
+def upgradeCharDb(db, dbver):
+    if dbver < 2:
+        upgradeV1(db)
+    if dbver < 3:
+        upgradeV2(db)
+    if dbver < 4:
+        upgradeV3(db)
+
+def upgradeV1(db):
+    csr = db.cursor()
+    csr.execute("BEGIN")
+    try:
+        csr.execute("ALTER TABLE status RENAME TO status_v1")
+        for statement in STATUS_SCHEMA:
+            csr.execute(statement)
+
+        rows = []
+        csr.execute("SELECT quest_name, state FROM status_v1")
+        for questName, state in csr.fetchall():
+            key = parseV1Key(questName)
+            if key is None or state not in STATE_CODES:
+                print("Warning: Dropping unrecognized status {!r} = {!r}".format(questName, state))
+                continue
+            rows.append(key + (STATE_CODES[state],))
+        csr.executemany("INSERT OR REPLACE INTO status (kind, area, item, mode, state)"
+                        " VALUES (?, ?, ?, ?, ?)", rows)
+
+        csr.execute("DROP TABLE status_v1")
+        csr.execute("UPDATE config SET value='2' WHERE key='Version'")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def upgradeV2(db):
+    # Adds the status history; changes before this have no history
+    csr = db.cursor()
+    csr.execute("BEGIN")
+    try:
+        for statement in HISTORY_SCHEMA:
+            csr.execute(statement)
+        csr.execute("UPDATE config SET value='3' WHERE key='Version'")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def upgradeV3(db):
+    # Adds the undo stack
+    csr = db.cursor()
+    csr.execute("BEGIN")
+    try:
+        for statement in UNDO_SCHEMA:
+            csr.execute(statement)
+        csr.execute("UPDATE config SET value='4' WHERE key='Version'")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def replayJournal(db, journalName):
+    try:
+        with open(journalName, 'r', encoding='utf-8') as jf:
+            lines = jf.readlines()
+    except FileNotFoundError:
+        return
+
+    changes = []
+    for line in lines:
+        try:
+            kind, area, item, mode, state = json.loads(line)
+        except ValueError:
+            # A partially written final line from a crash
+            continue
+        changes.append(((kind, area, item, mode), state))
+    if changes:
+        saveStatusChanges(db, changes)
+        db.commit()
+
+
+# Write-behind buffer for status changes.  Changes are kept in memory and
+# appended to a small journal file next to the character database, so they
+# can be committed to the database in groups.  Anything left in the journal
+# by a crash is replayed the next time the character is opened.
+class StatusJournal:
+    def __init__(self, db, journalName):
+        self.db = db
+        self.journalName = journalName
+        self.pending = {}
+
+        self.replay()
+        self.journal = open(journalName, 'w', encoding='utf-8')
+
+    def replay(self):
+        replayJournal(self.db, self.journalName)
+
+    def setList(self, changes):
+        lines = []
+        for key, state in changes:
+            self.pending[key] = state
+            lines.append(json.dumps(list(key) + [state]) + '\n')
+        self.journal.write(''.join(lines))
+        self.journal.flush()
+
+    def applyPending(self, statusMap, kinds, areaName):
+        kinds = set(status[0] for status in kinds)
+        for key, state in self.pending.items():
+            if key[0] in kinds and key[1] == areaName:
+                statusMap[key] = state
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        saveStatusChanges(self.db, self.pending.items())
+        self.db.commit()
+        self.pending.clear()
+        self.journal.seek(0)
+        self.journal.truncate()
+
+    def close(self):
+        self.flush()
+        self.journal.close()
+        os.remove(self.journalName)
+
+
+# An open character: its database, write-behind journal and config, plus
+# the status maps of areas already viewed.  The cached maps are the same
+# objects the GUI updates, so they stay current as long as every change
+# goes through the session's journal.
+class CharSession:
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.db = openCharDb(fileName)
+        self.journal = StatusJournal(self.db, fileName + '.pending')
+        self.undoStack = UndoStack(self.db)
+        self.statusMaps = {}
+        # Progress counts and remaining rank rewards cached by the GUI for
+        # this character
+        self.progress = None
+        self.ranks = None
+
+        csr = self.db.cursor()
+        csr.execute("SELECT key, value FROM config")
+        config = dict(csr.fetchall())
+        self.name = config.get('Name')
+        self.charType = config.get('Type')
+        self.profession = config.get('Profession1')
+        self.profession2 = config.get('Profession2')
+
+    def areaStatus(self, kinds, areaName):
+        key = (tuple(kinds), areaName)
+        statusMap = self.statusMaps.get(key)
+        if statusMap is None:
+            statusMap = loadAreaStatus(self.db, kinds, areaName)
+            self.journal.applyPending(statusMap, kinds, areaName)
+            self.statusMaps[key] = statusMap
+        return statusMap
+
+    def setConfig(self, key, value):
+        csr = self.db.cursor()
+        csr.execute("UPDATE config SET value=? WHERE key=?", (value, key))
+        self.db.commit()
+
+    def invalidate(self):
+        # Call after changing the status table other than through the journal
+        self.undoStack = UndoStack(self.db)
+        self.statusMaps.clear()
+        self.progress = None
+        self.ranks = None
+
+    def flush(self):
+        # New undo steps are committed along with the changes they record
+        self.undoStack.save()
+        self.journal.flush()
+        self.db.commit()
+
+    def undo(self):
+        # Returns the changes made, as (key, old state, new state) with None
+        # for "no row"
+        self.flush()
+        return self.applyChanges(self.undoStack.undo())
+
+    def redo(self):
+        self.flush()
+        return self.applyChanges(self.undoStack.redo())
+
+    def applyChanges(self, changes):
+        # Writes the changes in one transaction and updates the cached
+        # status maps to match
+        try:
+            saveStatusChanges(self.db, [(key, new) for key, old, new in changes])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            self.undoStack = UndoStack(self.db)
+            raise
+        for (kinds, areaName), statusMap in self.statusMaps.items():
+            for key, old, new in changes:
+                if key[1] == areaName and (key[0], key[3]) in kinds:
+                    if new is None:
+                        statusMap.pop(key, None)
+                    else:
+                        statusMap[key] = new
+        return changes
+
+    def close(self):
+        self.flush()
+        self.journal.close()
+        self.db.close()
+
+
+# Keeps the most recently used characters open, closing the least recently
+# used one beyond `size`.
+class CharPool:
+    def __init__(self, size=CHAR_POOL_SIZE):
+        self.size = size
+        self.sessions = collections.OrderedDict()
+
+    def open(self, fileName):
+        fileName = os.path.abspath(fileName)
+        session = self.sessions.pop(fileName, None)
+        if session is None:
+            session = CharSession(fileName)
+        self.sessions[fileName] = session
+        while len(self.sessions) > self.size:
+            self.sessions.popitem(last=False)[1].close()
+        return session
+
+    def flush(self):
+        for session in self.sessions.values():
+            session.flush()
+
+    def close(self):
+        while self.sessions:
+            self.sessions.popitem()[1].close()
@@ -0,0 +1,70 @@
+import sqlite3
+
+from .status import *
+from .chardb import CHAR_DB_VERSION, openCharDb
+
+# SQLite's compiled-in default, for Python versions without getlimit()
+DEFAULT_ATTACH_LIMIT = 10
+
+
+def attachLimit(db):
+    try:
+        return db.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    except AttributeError:
+        return DEFAULT_ATTACH_LIMIT
+
+def attachBatch(db, fileNames):
+    csr = db.cursor()
+    for idx, fileName in enumerate(fileNames):
+        csr.execute("ATTACH DATABASE ? AS c{}".format(idx), (fileName,))
+
+def detachAll(db):
+    csr = db.cursor()
+    csr.execute("PRAGMA database_list")
+    for name in [row[1] for row in csr.fetchall() if row[1] not in ('main', 'temp')]:
+        csr.execute("DETACH DATABASE {}".format(name))
+
+def unionQuery(count, query):
+    # One copy of query per attached database, tagged with its index
+    return " UNION ALL ".join("SELECT {} AS char, * FROM ({})".format(idx, query.format('c{}'.format(idx)))
+                              for idx in range(count))
+
+def outdatedChars(db, count):
+    csr = db.cursor()
+    csr.execute(unionQuery(count, "SELECT value FROM {}.config WHERE key='Version'"))
+    return [idx for idx, version in csr if int(version) < CHAR_DB_VERSION]
+
+def compareStatus(fileNames, statuses, areaName):
+    # Returns one {(status, item name): state name} dict per character file,
+    # read through a single connection with the character databases
+    # attached as many at a time as SQLite allows.
+    kinds = sorted(set(status[0] for status in statuses))
+    results = [{} for fileName in fileNames]
+    db = sqlite3.connect(':memory:')
+    try:
+        limit = attachLimit(db)
+        for start in range(0, len(fileNames), limit):
+            batch = fileNames[start:start+limit]
+            attachBatch(db, batch)
+            try:
+                outdated = outdatedChars(db, len(batch))
+                if outdated:
+                    # Older databases are upgraded the same way as when
+                    # the character is opened
+                    detachAll(db)
+                    for idx in outdated:
+                        openCharDb(batch[idx]).close()
+                    attachBatch(db, batch)
+
+                query = "SELECT kind, mode, item, state FROM {{}}.status" \
+                        " WHERE area=? AND kind IN ({})".format(','.join('?' * len(kinds)))
+                csr = db.cursor()
+                csr.execute(unionQuery(len(batch), query), ([areaName] + kinds) * len(batch))
+                for idx, kind, mode, item, state in csr:
+                    if (kind, mode) in statuses and state != STATE_NONE:
+                        results[start + idx][((kind, mode), item)] = stateName(state)
+            finally:
+                detachAll(db)
+    finally:
+        db.close()
+    return results
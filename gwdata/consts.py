@@ -1,3 +1,5 @@
+import os
+
 PROFESSION_ANY      = 0
 PROFESSION_PRIMARY  = 1
 PROFESSION_UNLOCKED = 2
@@ -33,4 +35,8 @@ TREE_TYPE_MISSIONS = 2
 TREE_TYPE_SKILLS   = 3
 TREE_TYPE_VANQUISH = 4
 
-WIKI_URL = "https://wiki.guildwars.com/wiki/"
+WIKI_HOST = "https://wiki.guildwars.com"
+WIKI_URL = WIKI_HOST + "/wiki/"
+
+HOME_BASE = os.getenv('USERPROFILE') or os.getenv('HOME')
+DATA_BASE = os.path.join(HOME_BASE, '.gwtrack')
@@ -0,0 +1,106 @@
+import time
+import datetime
+
+from .status import *
+from .progress import FINISHED_STATES, areaStatuses, areaCampaign
+
+# Every status change is appended to the history table, with NULL for "no
+# row" on either side.  history_days holds the net number of items finished
+# per day, area and status column, kept current as changes are written so
+# the timeline never has to read the full log.
+HISTORY_SCHEMA = [
+    "CREATE TABLE history (id INTEGER PRIMARY KEY, time REAL NOT NULL,"
+    " kind INTEGER NOT NULL, area TEXT NOT NULL, item TEXT NOT NULL,"
+    " mode INTEGER NOT NULL, old_state INTEGER, new_state INTEGER)",
+    "CREATE TABLE history_days (day INTEGER NOT NULL, kind INTEGER NOT NULL,"
+    " mode INTEGER NOT NULL, area TEXT NOT NULL, done INTEGER NOT NULL DEFAULT 0,"
+    " PRIMARY KEY (day, kind, mode, area)) WITHOUT ROWID",
+]
+
+# Past this many changes, the previous states are read in one query
+BULK_CHANGES = 256
+
+FINISHED_CODES = {status: set(STATE_CODES[state] for state in states)
+                  for status, states in FINISHED_STATES.items()}
+
+
+def dayNumber(when):
+    # Local calendar day, as a proleptic Gregorian ordinal
+    return datetime.date.fromtimestamp(when).toordinal()
+
+def saveStatusChanges(db, changes, when=None):
+    # Writes (status key, state) changes to the status table, logging each
+    # one that actually changes a state.  A state of None deletes the row.
+    # Runs in the caller's transaction.
+    if when is None:
+        when = time.time()
+    day = dayNumber(when)
+    csr = db.cursor()
+    changes = list(changes)
+    current = {}
+    if len(changes) > BULK_CHANGES:
+        csr.execute("SELECT kind, area, item, mode, state FROM status")
+        current = {row[:4]: row[4] for row in csr}
+        for key, state in changes:
+            current.setdefault(tuple(key), None)
+    written = {}
+    history = []
+    deltas = {}
+    for key, state in changes:
+        key = tuple(key)
+        if key in current:
+            old = current[key]
+        else:
+            csr.execute("SELECT state FROM status WHERE kind=? AND area=? AND item=? AND mode=?",
+                        key)
+            row = csr.fetchone()
+            old = row[0] if row is not None else None
+        new = STATE_CODES[state] if state is not None else None
+        current[key] = new
+        if old == new:
+            continue
+        written[key] = new
+        history.append((when,) + key + (old, new))
+
+        finished = FINISHED_CODES.get((key[0], key[3]), ())
+        delta = (new in finished) - (old in finished)
+        if delta:
+            dayKey = (day, key[0], key[3], key[1])
+            deltas[dayKey] = deltas.get(dayKey, 0) + delta
+
+    csr.executemany("INSERT INTO history (time, kind, area, item, mode, old_state, new_state)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", history)
+    csr.executemany("REPLACE INTO status (kind, area, item, mode, state) VALUES (?, ?, ?, ?, ?)",
+                    [key + (new,) for key, new in written.items() if new is not None])
+    csr.executemany("DELETE FROM status WHERE kind=? AND area=? AND item=? AND mode=?",
+                    [key for key, new in written.items() if new is None])
+    csr.executemany("INSERT OR IGNORE INTO history_days (day, kind, mode, area)"
+                    " VALUES (?, ?, ?, ?)", list(deltas))
+    csr.executemany("UPDATE history_days SET done=done+? WHERE day=? AND kind=? AND mode=? AND area=?",
+                    [(delta,) + dayKey for dayKey, delta in deltas.items()])
+
+def loadTimeline(db, weekly=False):
+    # Returns [(first day of the period, {(status, area name): finished})],
+    # oldest first.  Weeks start on Monday.
+    periods = {}
+    csr = db.cursor()
+    csr.execute("SELECT day, kind, mode, area, done FROM history_days WHERE done != 0")
+    for day, kind, mode, area, done in csr:
+        if weekly:
+            day -= datetime.date.fromordinal(day).weekday()
+        counts = periods.setdefault(day, {})
+        counts[((kind, mode), area)] = counts.get(((kind, mode), area), 0) + done
+    return [(datetime.date.fromordinal(day), periods[day]) for day in sorted(periods)]
+
+def campaignCounts(counts, areas):
+    # Regroups one period's counts by campaign
+    campaigns = {}
+    for area in areas:
+        for status in areaStatuses(area):
+            campaigns[(status, area.name)] = areaCampaign(area)
+    result = {}
+    for key, done in counts.items():
+        campaign = campaigns.get(key)
+        if campaign is not None:
+            result[campaign] = result.get(campaign, 0) + done
+    return result
@@ -1,55 +1,30 @@
+import sys
 from .consts import TREE_TYPE_MISSIONS
 
 class MissionInfo:
+    __slots__ = ('name', 'wiki', 'rank_type', 'rank', 'hm_rank', 'z_xp',
+                 'z_rank', 'z_coins')
+
     def __init__(self, info, name):
         self.name = name
 
         # Required fields
-        try:
-            self.wiki = info['Wiki']
-        except KeyError:
-            self.wiki = name.replace(' ', '_').replace('?', '%3F')
+        self.wiki = info.get('Wiki') or name.replace(' ', '_').replace('?', '%3F')
 
         # Optional fields
-        try:
-            self.rank_type = info['Type']
-        except KeyError:
-            self.rank_type = ''
-
-        try:
-            self.rank = info['Rank']
-        except KeyError:
-            self.rank = 0
-
-        try:
-            self.hm_rank = info['HM_Rank']
-        except KeyError:
-            self.hm_rank = 0
-
-        try:
-            self.z_xp = info['Z_XP']
-        except KeyError:
-            self.z_xp = 0
-
-        try:
-            self.z_rank = info['Z_Rank']
-        except KeyError:
-            self.z_rank = 0
-
-        try:
-            self.z_coins = info['Z_Coins']
-        except KeyError:
-            self.z_coins = 0
+        self.rank_type = sys.intern(info.get('Type', ''))
+        self.rank = info.get('Rank', 0)
+        self.hm_rank = info.get('HM_Rank', 0)
+        self.z_xp = info.get('Z_XP', 0)
+        self.z_rank = info.get('Z_Rank', 0)
+        self.z_coins = info.get('Z_Coins', 0)
 
 
 class MissionArea:
     def __init__(self, info, name):
         self.name = name
 
-        try:
-            mission_list = info['Missions']
-        except KeyError:
-            mission_list = None
+        mission_list = info.get('Missions')
 
         self.missions = []
         if mission_list is not None:
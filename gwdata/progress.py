@@ -0,0 +1,157 @@
+from .status import *
+from .quests import QuestArea
+from .missions import MissionArea
+from .skills import SkillArea
+from .vanquish import VanquishArea
+from .search import areaItems
+
+# States which count an item as finished for each status column
+FINISHED_STATES = {
+    STATUS_QUEST:       ("Done",),
+    STATUS_MISSION:     ("Standard", "Expert", "Master"),
+    STATUS_MISSION_HM:  ("Standard", "Expert", "Master"),
+    STATUS_SKILL:       ("Known",),
+    STATUS_VANQUISH:    ("Done",),
+}
+
+# States which remove an item from the total entirely
+EXCLUDED_STATES = {
+    STATUS_QUEST:       ("N/A",),
+}
+
+STATUS_TITLES = {
+    STATUS_QUEST:       "Quests",
+    STATUS_MISSION:     "Missions",
+    STATUS_MISSION_HM:  "Missions (HM)",
+    STATUS_SKILL:       "Elite Skills",
+    STATUS_VANQUISH:    "Vanquishes",
+}
+
+
+def areaStatuses(area):
+    if isinstance(area, QuestArea):
+        return (STATUS_QUEST,)
+    elif isinstance(area, MissionArea):
+        return (STATUS_MISSION, STATUS_MISSION_HM)
+    elif isinstance(area, SkillArea):
+        return (STATUS_SKILL,)
+    elif isinstance(area, VanquishArea):
+        return (STATUS_VANQUISH,)
+    raise RuntimeError('areaStatuses called with invalid object')
+
+def areaCampaign(area):
+    # Mission, skill and vanquish areas are already named after a campaign
+    if isinstance(area, QuestArea):
+        return area.campaign
+    return area.name
+
+def percent(done, total):
+    if total == 0:
+        return 0.0
+    return 100.0 * done / total
+
+
+class AreaProgress:
+    __slots__ = ('area', 'status', 'done', 'total')
+
+    def __init__(self, area, status, done, total):
+        self.area = area
+        self.status = status
+        self.done = done
+        self.total = total
+
+    def percent(self):
+        return percent(self.done, self.total)
+
+
+def loadStates(db):
+    # (kind, mode) -> area name -> item name -> state name
+    states = {}
+    csr = db.cursor()
+    csr.execute("SELECT kind, mode, area, item, state FROM status WHERE state != ?",
+                (STATE_NONE,))
+    for kind, mode, area, item, state in csr:
+        states.setdefault((kind, mode), {}).setdefault(area, {})[item] = stateName(state)
+    return states
+
+# Per-state item counts for each area and status column, restricted to the
+# items in the catalog.  After the initial load, counts are kept current
+# from individual status changes instead of being requeried.
+class ProgressTracker:
+    def __init__(self):
+        # (status, area name) -> (area, item names)
+        self.areas = {}
+        # (status, area name) -> {state name: count}
+        self.counts = {}
+
+    def addArea(self, area):
+        names = frozenset(info.name for info in areaItems(area))
+        for status in areaStatuses(area):
+            self.areas[(status, area.name)] = (area, names)
+            self.counts[(status, area.name)] = {}
+
+    def load(self, db):
+        # A new counts dict, so one set aside by the caller isn't clobbered
+        states = loadStates(db) if db is not None else {}
+        self.counts = {}
+        for (status, areaName), (area, names) in self.areas.items():
+            counts = {}
+            for item, state in states.get(status, {}).get(areaName, {}).items():
+                if item in names:
+                    counts[state] = counts.get(state, 0) + 1
+            self.counts[(status, areaName)] = counts
+
+    def update(self, key, oldState, newState):
+        kind, areaName, item, mode = key
+        status = (kind, mode)
+        entry = self.areas.get((status, areaName))
+        if entry is None or item not in entry[1] or oldState == newState:
+            return
+        counts = self.counts[(status, areaName)]
+        # The old state may not have been counted if the status table was
+        # changed behind the tracker's back
+        if oldState and oldState in counts:
+            counts[oldState] -= 1
+            if counts[oldState] <= 0:
+                del counts[oldState]
+        if newState:
+            counts[newState] = counts.get(newState, 0) + 1
+
+    def stateCounts(self, status, area):
+        return self.counts.get((status, area.name), {})
+
+    def progress(self, status, area):
+        counts = self.stateCounts(status, area)
+        done = sum(counts.get(state, 0) for state in FINISHED_STATES[status])
+        total = len(self.areas[(status, area.name)][1])
+        total -= sum(counts.get(state, 0) for state in EXCLUDED_STATES.get(status, ()))
+        return AreaProgress(area, status, done, total)
+
+    def areaProgress(self, area):
+        return [self.progress(status, area) for status in areaStatuses(area)]
+
+def loadProgress(db, areas):
+    tracker = ProgressTracker()
+    for area in areas:
+        tracker.addArea(area)
+    tracker.load(db)
+    progress = []
+    for area in areas:
+        progress += tracker.areaProgress(area)
+    return progress
+
+def sumProgress(progress):
+    # Sums area progress into {status: [done, total]}
+    totals = {}
+    for entry in progress:
+        counts = totals.setdefault(entry.status, [0, 0])
+        counts[0] += entry.done
+        counts[1] += entry.total
+    return totals
+
+def campaignProgress(progress):
+    # Sums area progress into {campaign: {status: [done, total]}}
+    campaigns = {}
+    for entry in progress:
+        campaigns.setdefault(areaCampaign(entry.area), []).append(entry)
+    return {campaign: sumProgress(entries) for campaign, entries in campaigns.items()}
@@ -2,66 +2,49 @@ import sys
 from .consts import *
 from . import rewards
 
+PROFESSION_LOCKS = {
+    'Any':      PROFESSION_ANY,
+    'Primary':  PROFESSION_PRIMARY,
+    'Unlocked': PROFESSION_UNLOCKED,
+}
+
 
 class QuestInfo:
+    __slots__ = ('name', 'wiki', 'quest_type', 'repeat', 'xp', 'profession',
+                 'profession_lock', 'char_type', 'reward')
+
     def __init__(self, info, name):
         self.name = name
 
         # Required fields
-        try:
-            self.wiki = info['Wiki']
-        except KeyError:
-            self.wiki = name.replace(' ', '_').replace('?', '%3F')
+        self.wiki = info.get('Wiki') or name.replace(' ', '_').replace('?', '%3F')
 
         try:
-            self.quest_type = info['Type']
+            self.quest_type = sys.intern(info['Type'])
         except KeyError:
             print("{}: Error: No quest type specified".format(name))
             sys.exit(1)
 
         # Optional fields
-        try:
-            self.repeat = info['Repeatable']
-        except KeyError:
-            self.repeat = False
+        self.repeat = info.get('Repeatable', False)
         if type(self.repeat) != bool:
             print("{}: Error: Invalid value specified for Repeatable: {}".format(name, self.repeat))
             sys.exit(1)
 
-        try:
-            self.xp = info['XP']
-        except KeyError:
-            self.xp = 0
-
-        try:
-            self.profession = info['Profession']
-        except KeyError:
-            self.profession = None
+        self.xp = info.get('XP', 0)
+        profession = info.get('Profession')
+        self.profession = sys.intern(profession) if profession is not None else None
 
+        profession_lock = info.get('Profession_Lock', 'Any')
         try:
-            profession_lock = info['Profession_Lock']
+            self.profession_lock = PROFESSION_LOCKS[profession_lock]
         except KeyError:
-            profession_lock = 'Any'
-        if profession_lock == 'Any':
-            self.profession_lock = PROFESSION_ANY
-        elif profession_lock == 'Primary':
-            self.profession_lock = PROFESSION_PRIMARY
-        elif profession_lock == 'Unlocked':
-            self.profession_lock = PROFESSION_UNLOCKED
-        else:
             print("{}: Error: Unsupported Profession_Lock: {}".format(name, profession_lock))
             sys.exit(1)
 
-        try:
-            self.char_type = info['Character']
-        except KeyError:
-            self.char_type = None
-
-        try:
-            reward_list = info['Reward']
-        except KeyError:
-            reward_list = []
-        self.reward = rewards.mapRewards(reward_list)
+        char_type = info.get('Character')
+        self.char_type = sys.intern(char_type) if char_type is not None else None
+        self.reward = rewards.mapRewards(info.get('Reward', ()))
 
     def rewardString(self):
         return rewards.rewardToSummary(self.reward)
@@ -75,18 +58,82 @@ class QuestArea:
         self.name = name
 
         try:
-            self.campaign = info['Campaign']
+            self.campaign = sys.intern(info['Campaign'])
         except KeyError:
             print("{}: Error: No campaign specified".format(name))
             sys.exit(1)
 
-        try:
-            quest_list = info['Quests']
-        except KeyError:
-            quest_list = None
+        quest_list = info.get('Quests')
 
         self.quests = []
         if quest_list is not None:
             for quest in quest_list:
                 self.quests.append(QuestInfo(quest_list[quest], quest))
         self.quests = sorted(self.quests, key=lambda q: q.name)
+        self.quest_rows = {quest.name: idx for idx, quest in enumerate(self.quests)}
+        self.buildEligibility()
+        self.buildRewards()
+
+    def buildEligibility(self):
+        # Bit N of each mask corresponds to self.quests[N]
+        self.any_type_mask = 0
+        self.type_masks = {}
+        self.any_profession_mask = 0
+        self.profession_masks = {}
+        self.primary_masks = {}
+        self.unlocked_masks = {}
+
+        for idx, quest in enumerate(self.quests):
+            bit = 1 << idx
+            if quest.char_type is None:
+                self.any_type_mask |= bit
+            else:
+                self.type_masks[quest.char_type] = self.type_masks.get(quest.char_type, 0) | bit
+
+            if quest.profession is None:
+                self.any_profession_mask |= bit
+            elif quest.profession_lock == PROFESSION_ANY:
+                self.profession_masks[quest.profession] = \
+                        self.profession_masks.get(quest.profession, 0) | bit
+            elif quest.profession_lock == PROFESSION_PRIMARY:
+                self.primary_masks[quest.profession] = \
+                        self.primary_masks.get(quest.profession, 0) | bit
+            else:
+                self.unlocked_masks[quest.profession] = \
+                        self.unlocked_masks.get(quest.profession, 0) | bit
+
+    def buildRewards(self):
+        # reward_masks[REWARD_*] has bit N set if self.quests[N] grants it
+        self.reward_masks = [0] * REWARD_MAX
+        for idx, quest in enumerate(self.quests):
+            for reward_type in range(REWARD_MAX):
+                if rewards.hasReward(quest.reward, reward_type):
+                    self.reward_masks[reward_type] |= 1 << idx
+
+    def rewardMask(self, reward):
+        # Quests granting any of the rewards in the reward bitmask
+        mask = 0
+        for reward_type in range(REWARD_MAX):
+            if rewards.hasReward(reward, reward_type):
+                mask |= self.reward_masks[reward_type]
+        return mask
+
+    def rowsMask(self, names):
+        mask = 0
+        for name in names:
+            idx = self.quest_rows.get(name)
+            if idx is not None:
+                mask |= 1 << idx
+        return mask
+
+    def eligibleMask(self, char_type, profession, profession2):
+        # Profession quests, and quests locked to an unlocked profession, are
+        # available with either the primary or secondary profession.
+        typeMask = self.any_type_mask | self.type_masks.get(char_type, 0)
+        professionMask = self.any_profession_mask \
+                | self.profession_masks.get(profession, 0) \
+                | self.profession_masks.get(profession2, 0) \
+                | self.primary_masks.get(profession, 0) \
+                | self.unlocked_masks.get(profession, 0) \
+                | self.unlocked_masks.get(profession2, 0)
+        return typeMask & professionMask
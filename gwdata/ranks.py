@@ -0,0 +1,132 @@
+import array
+import itertools
+
+from .status import *
+from .missions import MissionArea
+from .vanquish import VanquishArea
+from .progress import FINISHED_STATES, loadStates
+
+
+class RankStatus:
+    __slots__ = ('nmOpen', 'hmOpen', 'zOpen', 'nmDone', 'hmDone')
+
+    def __init__(self, size):
+        # 1 where the reward is still available
+        self.nmOpen = bytearray(size)
+        self.hmOpen = bytearray(size)
+        self.zOpen = bytearray(size)
+        # 1 where the item is finished in that mode
+        self.nmDone = bytearray(size)
+        self.hmDone = bytearray(size)
+
+
+class RankTotals:
+    __slots__ = ('ranks', 'z_xp', 'z_coins')
+
+    def __init__(self, ranks, z_xp, z_coins):
+        # rank type -> [normal mode, hard mode, Zaishen] points
+        self.ranks = ranks
+        self.z_xp = z_xp
+        self.z_coins = z_coins
+
+
+# The rank, Zaishen XP and Zaishen coin rewards of every mission and
+# vanquish, stored column-wise so the remaining totals for a character are
+# a handful of C-level passes over flat arrays.
+#
+# Missions grant `rank` points once finished in normal mode and `hm_rank`
+# once finished in hard mode.  The Zaishen bounty for a mission or
+# vanquish is counted as available until it has been finished at all.
+class RankCalculator:
+    def __init__(self):
+        self.positions = {}
+        self.kinds = array.array('b')
+        self.rankTypes = []
+        self.nmRank = {}
+        self.hmRank = {}
+        self.zRank = {}
+        self.z_xp = array.array('q')
+        self.z_coins = array.array('q')
+
+    def size(self):
+        return len(self.kinds)
+
+    def rankColumn(self, columns, rankType):
+        if rankType not in columns:
+            if rankType not in self.rankTypes:
+                self.rankTypes.append(rankType)
+            columns[rankType] = array.array('q', bytes(8 * self.size()))
+        return columns[rankType]
+
+    def addItem(self, kind, areaName, info, rankType, rank, hm_rank, z_rank_type):
+        pos = self.size()
+        self.positions[(kind, areaName, info.name)] = pos
+        self.kinds.append(kind)
+        self.z_xp.append(info.z_xp)
+        self.z_coins.append(info.z_coins)
+        for columns in (self.nmRank, self.hmRank, self.zRank):
+            for column in columns.values():
+                column.append(0)
+        if rankType and rank:
+            self.rankColumn(self.nmRank, rankType)[pos] = rank
+        if rankType and hm_rank:
+            self.rankColumn(self.hmRank, rankType)[pos] = hm_rank
+        if z_rank_type and info.z_rank:
+            self.rankColumn(self.zRank, z_rank_type)[pos] = info.z_rank
+
+    def addArea(self, area):
+        if isinstance(area, MissionArea):
+            for info in area.missions:
+                self.addItem(KIND_MISSION, area.name, info, info.rank_type, info.rank,
+                             info.hm_rank, info.rank_type)
+        elif isinstance(area, VanquishArea):
+            for info in area.areas:
+                self.addItem(KIND_VANQUISH, area.name, info, info.rank_type, 0, 0,
+                             info.z_rank_type)
+
+    def newStatus(self):
+        status = RankStatus(self.size())
+        for pos, kind in enumerate(self.kinds):
+            if kind == KIND_MISSION:
+                status.nmOpen[pos] = status.hmOpen[pos] = 1
+            status.zOpen[pos] = 1
+        return status
+
+    def load(self, db):
+        status = self.newStatus()
+        states = loadStates(db) if db is not None else {}
+        for statusType in (STATUS_MISSION, STATUS_MISSION_HM, STATUS_VANQUISH):
+            for areaName, items in states.get(statusType, {}).items():
+                for item, state in items.items():
+                    self.update(status, statusKey(statusType, areaName, item), state)
+        return status
+
+    def update(self, status, key, state):
+        kind, areaName, item, mode = key
+        pos = self.positions.get((kind, areaName, item))
+        if pos is None:
+            return
+        done = 1 if state in FINISHED_STATES[(kind, mode)] else 0
+        if kind == KIND_MISSION:
+            if mode == MODE_HARD:
+                status.hmDone[pos] = done
+                status.hmOpen[pos] = 1 - done
+            else:
+                status.nmDone[pos] = done
+                status.nmOpen[pos] = 1 - done
+            status.zOpen[pos] = 0 if status.nmDone[pos] or status.hmDone[pos] else 1
+        else:
+            status.nmDone[pos] = done
+            status.zOpen[pos] = 1 - done
+
+    def totals(self, status):
+        compress = itertools.compress
+        ranks = {}
+        for rankType in self.rankTypes:
+            ranks[rankType] = [
+                sum(compress(self.nmRank[rankType], status.nmOpen)) if rankType in self.nmRank else 0,
+                sum(compress(self.hmRank[rankType], status.hmOpen)) if rankType in self.hmRank else 0,
+                sum(compress(self.zRank[rankType], status.zOpen)) if rankType in self.zRank else 0,
+            ]
+        return RankTotals(ranks, sum(compress(self.z_xp, status.zOpen)),
+                          sum(compress(self.z_coins, status.zOpen)))
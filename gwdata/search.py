@@ -0,0 +1,197 @@
+import bisect
+from array import array
+
+from .quests import QuestArea
+from .missions import MissionArea
+from .skills import SkillArea
+from .vanquish import VanquishArea
+
+SEARCH_LIMIT = 200
+SEARCH_CHUNK = 512
+# Candidates confirmed per call; the rest of the scan waits for the next call
+SEARCH_BUDGET = 1024
+
+
+def areaItems(area):
+    if isinstance(area, QuestArea):
+        return area.quests
+    elif isinstance(area, MissionArea):
+        return area.missions
+    elif isinstance(area, SkillArea):
+        return area.skills
+    elif isinstance(area, VanquishArea):
+        return area.areas
+    raise RuntimeError('areaItems called with invalid object')
+
+def searchFields(info):
+    fields = [info.name]
+    for attr in ('profession', 'attribute'):
+        value = getattr(info, attr, None)
+        if value:
+            fields.append(value)
+    return fields
+
+
+class SearchHit:
+    __slots__ = ('area', 'row')
+
+    def __init__(self, area, row):
+        # row is None for a hit on the area itself
+        self.area = area
+        self.row = row
+
+    def info(self):
+        if self.row is None:
+            return None
+        return areaItems(self.area)[self.row]
+
+    def name(self):
+        if self.row is None:
+            return self.area.name
+        return self.info().name
+
+
+# Substring search over the catalog.  Queries of three or more characters
+# are answered from trigram postings; shorter ones from a sorted word list.
+# A trigram search stops after SEARCH_BUDGET candidates; searching again
+# for the same (or a longer) query picks up where it stopped.
+class SearchIndex:
+    def __init__(self):
+        self.hits = []
+        self.texts = []
+        self.trigrams = {}
+        self.words = []
+        self.wordsSorted = True
+        self.lastQuery = None
+        self.lastResults = None
+        # Last candidate entry checked if the last scan stopped early, or None
+        self.lastScanned = None
+
+    def addArea(self, area):
+        self.addEntry(SearchHit(area, None), [area.name])
+        for row, info in enumerate(areaItems(area)):
+            self.addEntry(SearchHit(area, row), searchFields(info))
+
+    def addEntry(self, hit, fields):
+        entry = len(self.hits)
+        fields = [field.lower() for field in fields]
+        self.hits.append(hit)
+        self.texts.append('\0'.join(fields))
+
+        grams = set()
+        for field in fields:
+            for idx in range(len(field) - 2):
+                grams.add(field[idx:idx+3])
+            for word in field.split():
+                self.words.append((word, entry))
+        for gram in grams:
+            try:
+                self.trigrams[gram].append(entry)
+            except KeyError:
+                self.trigrams[gram] = array('i', (entry,))
+
+        self.wordsSorted = False
+        self.lastQuery = None
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        # While typing, each keystroke usually just narrows the last query,
+        # leaving only the entries past the last one scanned to check
+        if self.lastQuery is not None and len(self.lastQuery) >= 3 \
+                and query.startswith(self.lastQuery):
+            entries = [entry for entry in self.lastResults if query in self.texts[entry]]
+            if len(entries) >= limit:
+                entries = entries[:limit]
+                self.lastScanned = entries[-1]
+            elif self.lastScanned is not None:
+                entries += self.trigramSearch(query, limit - len(entries), self.lastScanned)
+        elif len(query) < 3:
+            entries = self.prefixSearch(query, limit)
+            self.lastScanned = None
+        else:
+            entries = self.trigramSearch(query, limit)
+
+        self.lastQuery = query
+        self.lastResults = entries
+        return [self.hits[entry] for entry in entries]
+
+    def isComplete(self, limit=SEARCH_LIMIT):
+        # False if the last search ran out of budget before finding `limit`
+        # matches; search again to continue it
+        return self.lastScanned is None or len(self.lastResults) >= limit
+
+    def prepare(self):
+        # Called once the catalog is loaded; otherwise the first short query
+        # pays for sorting the word list.
+        if not self.wordsSorted:
+            self.words.sort()
+            self.wordsSorted = True
+
+    def prefixSearch(self, query, limit):
+        self.prepare()
+
+        entries = []
+        seen = set()
+        idx = bisect.bisect_left(self.words, (query,))
+        while idx < len(self.words) and len(entries) < limit:
+            word, entry = self.words[idx]
+            if not word.startswith(query):
+                break
+            if entry not in seen:
+                seen.add(entry)
+                entries.append(entry)
+            idx += 1
+        return entries
+
+    def trigramSearch(self, query, limit, after=-1):
+        # Finds matching entries past `after`
+        candidates = None
+        for idx in range(len(query) - 2):
+            postings = self.trigrams.get(query[idx:idx+3])
+            if postings is None:
+                self.lastScanned = None
+                return []
+            start = bisect.bisect_right(postings, after)
+            if candidates is None or len(postings) - start < len(candidates) - first:
+                candidates = postings
+                first = start
+
+        # Scan the rarest trigram's postings and confirm each candidate
+        # against the full text, which also rejects matches that only exist
+        # across field boundaries.  Candidates are checked in chunks so a
+        # common trigram stops as soon as enough results are found.
+        texts = self.texts
+        entries = []
+        end = min(len(candidates), first + SEARCH_BUDGET)
+        for start in range(first, end, SEARCH_CHUNK):
+            entries += [entry for entry in candidates[start:min(start + SEARCH_CHUNK, end)]
+                        if query in texts[entry]]
+            if len(entries) >= limit:
+                entries = entries[:limit]
+                self.lastScanned = entries[-1]
+                return entries
+        self.lastScanned = candidates[end - 1] if end < len(candidates) else None
+        return entries
+
+
+def findRewardQuests(questAreas, reward, finished, character=None):
+    # All quests granting any of the rewards in the reward bitmask which are
+    # not in `finished` (area name -> item names).  If given, character is a
+    # (type, profession, profession2) tuple to restrict to eligible quests.
+    hits = []
+    for area in sorted(questAreas, key=lambda a: a.name):
+        mask = area.rewardMask(reward)
+        if not mask:
+            continue
+        mask &= ~area.rowsMask(finished.get(area.name, ()))
+        if character is not None:
+            mask &= area.eligibleMask(*character)
+
+        while mask:
+            low = mask & -mask
+            hits.append(SearchHit(area, low.bit_length() - 1))
+            mask ^= low
+    return hits
@@ -1,35 +1,28 @@
+import sys
 from .consts import TREE_TYPE_SKILLS
 
 class SkillInfo:
+    __slots__ = ('name', 'wiki', 'profession', 'attribute')
+
     def __init__(self, info, name):
         self.name = name
 
         # Required fields
-        try:
-            self.wiki = info['Wiki']
-        except KeyError:
-            self.wiki = name.replace(' ', '_').replace('?', '%3F')
+        self.wiki = info.get('Wiki') or name.replace(' ', '_').replace('?', '%3F')
 
         # Optional fields
-        try:
-            self.profession = info['Profession']
-        except KeyError:
-            self.profession = None
+        profession = info.get('Profession')
+        self.profession = sys.intern(profession) if profession is not None else None
 
-        try:
-            self.attribute = info['Attribute']
-        except KeyError:
-            self.attribute = None
+        attribute = info.get('Attribute')
+        self.attribute = sys.intern(attribute) if attribute is not None else None
 
 
 class SkillArea:
     def __init__(self, info, name):
         self.name = name
 
-        try:
-            skill_list = info['Skills']
-        except KeyError:
-            skill_list = None
+        skill_list = info.get('Skills')
 
         self.skills = []
         if skill_list is not None:
@@ -0,0 +1,93 @@
+KIND_QUEST    = 0
+KIND_MISSION  = 1
+KIND_SKILL    = 2
+KIND_VANQUISH = 3
+
+MODE_NORMAL = 0
+MODE_HARD   = 1
+
+# (kind, mode) pairs identifying each status column shown in the GUI
+STATUS_QUEST      = (KIND_QUEST, MODE_NORMAL)
+STATUS_MISSION    = (KIND_MISSION, MODE_NORMAL)
+STATUS_MISSION_HM = (KIND_MISSION, MODE_HARD)
+STATUS_SKILL      = (KIND_SKILL, MODE_NORMAL)
+STATUS_VANQUISH   = (KIND_VANQUISH, MODE_NORMAL)
+
+# Stored state codes.  These are written to the character databases, so
+# existing values must never be renumbered.
+STATE_NONE     = 0
+STATE_ACTIVE   = 1
+STATE_COMPLETE = 2
+STATE_DONE     = 3
+STATE_NA       = 4
+STATE_STANDARD = 5
+STATE_EXPERT   = 6
+STATE_MASTER   = 7
+STATE_UNLOCKED = 8
+STATE_KNOWN    = 9
+
+STATE_NAMES = [
+    "",
+    "Active",
+    "Complete",
+    "Done",
+    "N/A",
+    "Standard",
+    "Expert",
+    "Master",
+    "Unlocked",
+    "Known",
+]
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+
+# Prefixes used by the version 1 quest_name column
+V1_KIND_PREFIXES = {
+    'Mission':      STATUS_MISSION,
+    'Mission_HM':   STATUS_MISSION_HM,
+    'Skill':        STATUS_SKILL,
+    'Vanquish':     STATUS_VANQUISH,
+}
+
+
+def statusKey(status, areaName, itemName):
+    return (status[0], areaName, itemName, status[1])
+
+def parseV1Key(questName):
+    head, sep, itemName = questName.partition('::')
+    if not sep:
+        return None
+    kindName, sep, areaName = head.partition('!')
+    if not sep:
+        return statusKey(STATUS_QUEST, head, itemName)
+    try:
+        return statusKey(V1_KIND_PREFIXES[kindName], areaName, itemName)
+    except KeyError:
+        return None
+
+def stateName(code):
+    try:
+        return STATE_NAMES[code]
+    except (IndexError, TypeError):
+        return ""
+
+def loadAreaStatus(db, kinds, areaName):
+    kinds = sorted(set(status[0] for status in kinds))
+    csr = db.cursor()
+    csr.execute("SELECT kind, area, item, mode, state FROM status"
+                " WHERE kind IN ({}) AND area=?".format(','.join('?' * len(kinds))),
+                kinds + [areaName])
+    return {row[:4]: stateName(row[4]) for row in csr}
+
+def loadFinishedItems(db, status, states):
+    # Maps area name -> set of item names in one of the given states
+    csr = db.cursor()
+    csr.execute("SELECT area, item FROM status WHERE kind=? AND mode=?"
+                " AND state IN ({})".format(','.join('?' * len(states))),
+                list(status) + [STATE_CODES[state] for state in states])
+    finished = {}
+    for area, item in csr:
+        try:
+            finished[area].add(item)
+        except KeyError:
+            finished[area] = {item}
+    return finished
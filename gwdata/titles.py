@@ -0,0 +1,122 @@
+import os
+import threading
+import concurrent.futures
+
+from .status import *
+from .missions import MissionArea
+from .skills import SkillArea
+from .vanquish import VanquishArea
+from .search import areaItems
+from .chardb import openCharDbReadOnly
+
+TITLE_SCAN_WORKERS = 4
+
+# Account titles: the area type whose items count towards them, the status
+# column holding each character's completion, and the states which count.
+TITLES = [
+    ("Skill Hunter",    SkillArea,      STATUS_SKILL,       ("Known",)),
+    ("Vanquisher",      VanquishArea,   STATUS_VANQUISH,    ("Done",)),
+    ("Guardian",        MissionArea,    STATUS_MISSION_HM,  ("Master",)),
+]
+
+
+def charSignature(fileName):
+    # Writes to a character can sit in the WAL file until it's checkpointed,
+    # or in the journal until they're flushed, so those are part of the
+    # signature too
+    sig = []
+    for name in (fileName, fileName + '-wal', fileName + '.pending'):
+        try:
+            st = os.stat(name)
+            sig += [st.st_mtime_ns, st.st_size]
+        except FileNotFoundError:
+            sig += [None, None]
+    return tuple(sig)
+
+def scanChar(fileName):
+    # Returns (name, {(status, area name, item name)}) of the character's
+    # title completions
+    db = openCharDbReadOnly(fileName)
+    try:
+        csr = db.cursor()
+        csr.execute("SELECT value FROM config WHERE key='Name'")
+        name = csr.fetchone()[0]
+        done = set()
+        for title, areaClass, status, states in TITLES:
+            codes = [STATE_CODES[state] for state in states]
+            csr.execute("SELECT area, item FROM status WHERE kind=? AND mode=?"
+                        " AND state IN ({})".format(','.join('?' * len(codes))),
+                        [status[0], status[1]] + codes)
+            done.update((status, area, item) for area, item in csr)
+    finally:
+        db.close()
+    return name, done
+
+
+class TitleProgress:
+    __slots__ = ('title', 'area', 'status', 'holders')
+
+    def __init__(self, title, area, status):
+        self.title = title
+        self.area = area
+        self.status = status
+        # Item name -> names of the characters which completed it
+        self.holders = {info.name: [] for info in areaItems(area)}
+
+    def done(self):
+        return sum(1 for names in self.holders.values() if names)
+
+    def total(self):
+        return len(self.holders)
+
+    def charCounts(self):
+        counts = {}
+        for names in self.holders.values():
+            for name in names:
+                counts[name] = counts.get(name, 0) + 1
+        return counts
+
+
+# Scans character databases for title completions, several at a time.
+# Results are kept per database until its file changes.
+class TitleScanner:
+    def __init__(self, workers=TITLE_SCAN_WORKERS):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.cache = {}
+
+    def scanOne(self, fileName):
+        result = scanChar(fileName)
+        # Stat after reading, since closing the database can checkpoint it
+        with self.lock:
+            self.cache[fileName] = (charSignature(fileName), result)
+        return result
+
+    def scan(self, fileNames):
+        # Returns (name, completions) for each file, in order
+        with self.lock:
+            stale = [fileName for fileName in fileNames if fileName not in self.cache
+                     or self.cache[fileName][0] != charSignature(fileName)]
+        if stale:
+            workers = min(self.workers, len(stale))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(self.scanOne, stale))
+        with self.lock:
+            return [self.cache[fileName][1] for fileName in fileNames]
+
+
+def accountTitles(areas, chars):
+    # Combines the scanned characters into a TitleProgress for each title
+    # and campaign in the catalog
+    titles = []
+    for title, areaClass, status, states in TITLES:
+        for area in areas:
+            if not isinstance(area, areaClass):
+                continue
+            progress = TitleProgress(title, area, status)
+            for name, done in chars:
+                for item, holders in progress.holders.items():
+                    if (status, area.name, item) in done:
+                        holders.append(name)
+            titles.append(progress)
+    return titles
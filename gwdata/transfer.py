@@ -0,0 +1,199 @@
+import os
+import csv
+import json
+import difflib
+
+from .status import *
+from .progress import areaStatuses
+from .search import areaItems
+from .history import saveStatusChanges
+from .undo import clearUndo
+
+TRANSFER_FORMATS = ('csv', 'json')
+TRANSFER_FIELDS = ['type', 'area', 'item', 'state']
+
+# Rows written per executemany batch
+IMPORT_CHUNK = 5000
+# Problems kept for reporting; the rest are only counted
+MAX_PROBLEMS = 50
+JSON_READ_SIZE = 64 * 1024
+
+# Status column names, matching the version 1 key prefixes
+TYPE_NAMES = {STATUS_QUEST: 'Quest'}
+TYPE_NAMES.update({status: name for name, status in V1_KIND_PREFIXES.items()})
+TYPE_STATUSES = {name: status for status, name in TYPE_NAMES.items()}
+
+# States which can be set on each status column, as in the GUI menus
+STATUS_STATES = {
+    STATUS_QUEST:       ("", "Active", "Complete", "Done", "N/A"),
+    STATUS_MISSION:     ("", "Standard", "Expert", "Master"),
+    STATUS_MISSION_HM:  ("", "Standard", "Expert", "Master"),
+    STATUS_SKILL:       ("", "Unlocked", "Known"),
+    STATUS_VANQUISH:    ("", "Done"),
+}
+
+
+class TransferError(Exception):
+    pass
+
+
+class ImportResult:
+    __slots__ = ('imported', 'skipped', 'problems')
+
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        # (record number, message) for the first MAX_PROBLEMS skipped records
+        self.problems = []
+
+    def skip(self, recordNum, message):
+        self.skipped += 1
+        if len(self.problems) < MAX_PROBLEMS:
+            self.problems.append((recordNum, message))
+
+
+def transferFormat(fileName, format=None):
+    if format is None:
+        format = os.path.splitext(fileName)[1][1:].lower() or 'csv'
+    if format not in TRANSFER_FORMATS:
+        raise TransferError("Unsupported format {!r} (expected {})".format(
+                            format, ' or '.join(TRANSFER_FORMATS)))
+    return format
+
+def exportStatus(db, outFile, format):
+    # Streams every status row to outFile, returning the number written
+    csr = db.cursor()
+    csr.execute("SELECT kind, mode, area, item, state FROM status WHERE state != ?"
+                " ORDER BY kind, mode, area, item", (STATE_NONE,))
+    count = 0
+    if format == 'csv':
+        writer = csv.writer(outFile)
+        writer.writerow(TRANSFER_FIELDS)
+        for kind, mode, area, item, state in csr:
+            writer.writerow([TYPE_NAMES.get((kind, mode)), area, item, stateName(state)])
+            count += 1
+    else:
+        outFile.write('[')
+        for kind, mode, area, item, state in csr:
+            outFile.write(',\n' if count else '\n')
+            outFile.write(json.dumps(dict(zip(TRANSFER_FIELDS, [TYPE_NAMES.get((kind, mode)),
+                                                               area, item, stateName(state)]))))
+            count += 1
+        outFile.write('\n]\n')
+    return count
+
+def iterJson(inFile):
+    # Yields the values of a top level JSON array (or of a stream of
+    # whitespace separated values), reading the file a block at a time
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    inArray = None
+    eof = False
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or (inArray and buf[pos] == ',')):
+            pos += 1
+        if pos == len(buf) or (not eof and len(buf) - pos < JSON_READ_SIZE):
+            chunk = inFile.read(JSON_READ_SIZE)
+            if chunk:
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            eof = True
+            if pos == len(buf):
+                if inArray:
+                    raise TransferError("Invalid JSON: missing ']' at end of file")
+                break
+        if inArray is None:
+            inArray = buf[pos] == '['
+            if inArray:
+                pos += 1
+            continue
+        if inArray and buf[pos] == ']':
+            break
+        try:
+            value, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as err:
+            raise TransferError("Invalid JSON: {}".format(err))
+        yield value
+
+def readRecords(inFile, format):
+    # Yields (record number, record dict)
+    if format == 'csv':
+        reader = csv.DictReader(inFile)
+        if reader.fieldnames is None or not set(TRANSFER_FIELDS) <= set(reader.fieldnames):
+            raise TransferError("CSV header must include {}".format(', '.join(TRANSFER_FIELDS)))
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for recordNum, record in enumerate(iterJson(inFile), 1):
+            yield recordNum, record
+
+
+# Checks imported names against the catalog, suggesting the closest match
+# for names which aren't found (e.g. items renamed on the wiki).
+class CatalogNames:
+    def __init__(self, areas):
+        self.items = {}
+        for area in areas:
+            for status in areaStatuses(area):
+                self.items.setdefault(status, {})[area.name] = \
+                        frozenset(info.name for info in areaItems(area))
+
+    def suggest(self, name, choices):
+        matches = difflib.get_close_matches(name, list(choices), n=1)
+        if matches:
+            return " (did you mean {!r}?)".format(matches[0])
+        return ""
+
+    def check(self, record):
+        # Returns (status key, state), or raises TransferError
+        if not isinstance(record, dict):
+            raise TransferError("Expected an object with {}".format(', '.join(TRANSFER_FIELDS)))
+        typeName, areaName, itemName, state = [record.get(field) for field in TRANSFER_FIELDS]
+        status = TYPE_STATUSES.get(typeName)
+        if status is None:
+            raise TransferError("Unknown type {!r}{}".format(typeName,
+                                self.suggest(str(typeName), TYPE_STATUSES)))
+        areas = self.items.get(status, {})
+        if areaName not in areas:
+            raise TransferError("Unknown {} area {!r}{}".format(typeName, areaName,
+                                self.suggest(str(areaName), areas)))
+        if itemName not in areas[areaName]:
+            raise TransferError("Unknown item {!r} in {}{}".format(itemName, areaName,
+                                self.suggest(str(itemName), areas[areaName])))
+        state = state or ""
+        if state not in STATUS_STATES[status]:
+            raise TransferError("Invalid {} state {!r} for {}".format(typeName, state, itemName))
+        return statusKey(status, areaName, itemName), state
+
+def importStatus(db, inFile, format, areas, dryRun=False, chunkSize=IMPORT_CHUNK):
+    # Streams records from inFile into the status table.  Records which
+    # don't match the catalog are skipped and reported.  Everything is
+    # written in one transaction, so a failed import changes nothing.
+    # The import can't be undone, and clears the undo history.
+    names = CatalogNames(areas)
+    result = ImportResult()
+    chunk = []
+    try:
+        for recordNum, record in readRecords(inFile, format):
+            try:
+                chunk.append(names.check(record))
+            except TransferError as err:
+                result.skip(recordNum, str(err))
+                continue
+            if len(chunk) >= chunkSize:
+                if not dryRun:
+                    saveStatusChanges(db, chunk)
+                result.imported += len(chunk)
+                chunk = []
+        if chunk and not dryRun:
+            saveStatusChanges(db, chunk)
+        result.imported += len(chunk)
+        if result.imported and not dryRun:
+            clearUndo(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return result
@@ -0,0 +1,128 @@
+from .status import *
+
+# Number of edits which can be undone
+UNDO_LIMIT = 100
+
+# Each step is one edit: the state of every item it changed before and
+# after, with NULL for "no row".  Undone steps are kept for redo until the
+# next edit.
+UNDO_SCHEMA = [
+    "CREATE TABLE undo_steps (id INTEGER PRIMARY KEY, undone INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE undo_changes (step INTEGER NOT NULL, kind INTEGER NOT NULL,"
+    " area TEXT NOT NULL, item TEXT NOT NULL, mode INTEGER NOT NULL,"
+    " old_state INTEGER, new_state INTEGER)",
+    "CREATE INDEX undo_changes_step ON undo_changes (step)",
+]
+
+
+def stateCode(state):
+    return STATE_CODES[state] if state is not None else None
+
+def optionalStateName(code):
+    return stateName(code) if code is not None else None
+
+def clearUndo(db):
+    # Drops every undo and redo step, e.g. after an import changed the
+    # states they were recorded against.  Runs in the caller's transaction.
+    csr = db.cursor()
+    csr.execute("DELETE FROM undo_changes")
+    csr.execute("DELETE FROM undo_steps")
+
+
+class UndoStep:
+    __slots__ = ('id', 'changes')
+
+    def __init__(self, id, changes):
+        # Database row id, or None until saved
+        self.id = id
+        # [(key, old state, new state)], with None for "no row"
+        self.changes = changes
+
+
+# Undo and redo stacks for one character.  New steps are only kept in
+# memory until save() is called in the same transaction as the changes
+# they record.
+class UndoStack:
+    def __init__(self, db, limit=UNDO_LIMIT):
+        self.db = db
+        self.limit = limit
+        self.undoSteps = []
+        self.redoSteps = []
+        self.unsaved = []
+        self.dropped = []
+
+        steps = {}
+        csr = db.cursor()
+        csr.execute("SELECT id, undone FROM undo_steps ORDER BY id")
+        for stepId, undone in csr.fetchall():
+            step = steps[stepId] = UndoStep(stepId, [])
+            if undone:
+                self.redoSteps.append(step)
+            else:
+                self.undoSteps.append(step)
+        # The next step to redo is the earliest one undone
+        self.redoSteps.reverse()
+        csr.execute("SELECT step, kind, area, item, mode, old_state, new_state"
+                    " FROM undo_changes ORDER BY rowid")
+        for stepId, kind, area, item, mode, old, new in csr:
+            if stepId in steps:
+                steps[stepId].changes.append(((kind, area, item, mode), optionalStateName(old),
+                                              optionalStateName(new)))
+
+    def canUndo(self):
+        return bool(self.undoSteps)
+
+    def canRedo(self):
+        return bool(self.redoSteps)
+
+    def record(self, changes):
+        changes = [(tuple(key), old, new) for key, old, new in changes if old != new]
+        if not changes:
+            return
+        for step in self.redoSteps:
+            self.drop(step)
+        self.redoSteps = []
+        step = UndoStep(None, changes)
+        self.undoSteps.append(step)
+        self.unsaved.append(step)
+        while len(self.undoSteps) > self.limit:
+            self.drop(self.undoSteps.pop(0))
+
+    def drop(self, step):
+        if step.id is None:
+            self.unsaved.remove(step)
+        else:
+            self.dropped.append(step.id)
+
+    def save(self):
+        # Runs in the caller's transaction
+        csr = self.db.cursor()
+        if self.dropped:
+            ids = [(stepId,) for stepId in self.dropped]
+            csr.executemany("DELETE FROM undo_changes WHERE step=?", ids)
+            csr.executemany("DELETE FROM undo_steps WHERE id=?", ids)
+            self.dropped = []
+        for step in self.unsaved:
+            csr.execute("INSERT INTO undo_steps (undone) VALUES (0)")
+            step.id = csr.lastrowid
+            csr.executemany("INSERT INTO undo_changes (step, kind, area, item, mode,"
+                            " old_state, new_state) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            [(step.id,) + key + (stateCode(old), stateCode(new))
+                             for key, old, new in step.changes])
+        self.unsaved = []
+
+    def undo(self):
+        # Returns the changes which undo the last step, as (key, current
+        # state, restored state).  The caller applies them and commits.
+        step = self.undoSteps.pop()
+        self.redoSteps.append(step)
+        self.save()
+        self.db.execute("UPDATE undo_steps SET undone=1 WHERE id=?", (step.id,))
+        return [(key, new, old) for key, old, new in reversed(step.changes)]
+
+    def redo(self):
+        step = self.redoSteps.pop()
+        self.undoSteps.append(step)
+        self.save()
+        self.db.execute("UPDATE undo_steps SET undone=0 WHERE id=?", (step.id,))
+        return list(step.changes)
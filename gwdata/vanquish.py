@@ -1,60 +1,31 @@
+import sys
 from .consts import TREE_TYPE_VANQUISH
 
 class VanquishInfo:
+    __slots__ = ('name', 'wiki', 'min_foes', 'max_foes', 'rank_type', 'z_xp',
+                 'z_rank_type', 'z_rank', 'z_coins')
+
     def __init__(self, info, name):
         self.name = name
 
         # Required fields
-        try:
-            self.wiki = info['Wiki']
-        except KeyError:
-            self.wiki = name.replace(' ', '_').replace('?', '%3F')
+        self.wiki = info.get('Wiki') or name.replace(' ', '_').replace('?', '%3F')
 
         # Optional fields
-        try:
-            self.min_foes = info['Min']
-        except KeyError:
-            self.min_foes = 0
-
-        try:
-            self.max_foes = info['Max']
-        except KeyError:
-            self.max_foes = 0
-
-        try:
-            self.rank_type = info['Type']
-        except KeyError:
-            self.rank_type = ''
-
-        try:
-            self.z_xp = info['Z_XP']
-        except KeyError:
-            self.z_xp = 0
-
-        try:
-            self.z_rank_type = info['Z_Type']
-        except KeyError:
-            self.z_rank_type = self.rank_type
-
-        try:
-            self.z_rank = info['Z_Rank']
-        except KeyError:
-            self.z_rank = 0
-
-        try:
-            self.z_coins = info['Z_Coins']
-        except KeyError:
-            self.z_coins = 0
+        self.min_foes = info.get('Min', 0)
+        self.max_foes = info.get('Max', 0)
+        self.rank_type = sys.intern(info.get('Type', ''))
+        self.z_xp = info.get('Z_XP', 0)
+        self.z_rank_type = sys.intern(info.get('Z_Type', self.rank_type))
+        self.z_rank = info.get('Z_Rank', 0)
+        self.z_coins = info.get('Z_Coins', 0)
 
 
 class VanquishArea:
     def __init__(self, info, name):
         self.name = name
 
-        try:
-            area_list = info['Explorable Areas']
-        except KeyError:
-            area_list = None
+        area_list = info.get('Explorable Areas')
 
         self.areas = []
         if area_list is not None:
@@ -0,0 +1,370 @@
+import os
+import time
+import queue
+import sqlite3
+import hashlib
+import threading
+import http.client
+import html.parser
+import http.server
+import urllib.parse
+import urllib.error
+import urllib.request
+
+from .consts import WIKI_HOST
+
+WIKI_CACHE_SIZE = 256 * 1024 * 1024
+WIKI_MAX_AGE = 7 * 24 * 3600
+WIKI_TIMEOUT = 20
+PREFETCH_WORKERS = 4
+
+WIKI_CACHE_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS entries (path TEXT PRIMARY KEY, file TEXT NOT NULL,"
+    " content_type TEXT, etag TEXT, last_modified TEXT, size INTEGER NOT NULL,"
+    " fetched REAL NOT NULL, used REAL NOT NULL)",
+]
+
+
+class WikiCacheError(Exception):
+    def __init__(self, status, message):
+        super(WikiCacheError, self).__init__(message)
+        self.status = status
+
+
+class CacheEntry:
+    __slots__ = ('file', 'content_type', 'etag', 'last_modified', 'size', 'fetched', 'used')
+
+    def __init__(self, file, content_type, etag, last_modified, size, fetched, used):
+        self.file = file
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+        self.fetched = fetched
+        self.used = used
+
+
+class AssetParser(html.parser.HTMLParser):
+    def __init__(self):
+        super(AssetParser, self).__init__()
+        self.assets = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'img' or tag == 'script':
+            url = attrs.get('src')
+        elif tag == 'link' and attrs.get('rel') == 'stylesheet':
+            url = attrs.get('href')
+        else:
+            return
+        # Only same-site assets go through the cache
+        if url and url.startswith('/') and not url.startswith('//'):
+            self.assets.append(url.replace('&amp;', '&'))
+
+def pageAssets(body):
+    parser = AssetParser()
+    try:
+        parser.feed(body.decode('utf-8', 'replace'))
+    except Exception:
+        pass
+    return parser.assets
+
+
+# Disk cache for wiki pages and their assets, keyed on the URL path (and
+# query) relative to the wiki host.  Entries older than maxAge are
+# revalidated with a conditional request, and a stale copy is served if the
+# wiki can't be reached.  The least recently used entries are evicted once
+# the total size passes maxBytes.
+class WikiCache:
+    def __init__(self, cacheDir, upstream=WIKI_HOST, maxBytes=WIKI_CACHE_SIZE,
+                 maxAge=WIKI_MAX_AGE, onStore=None):
+        self.cacheDir = cacheDir
+        # Called as onStore(path, content type, body) from the fetching
+        # thread whenever new content is cached
+        self.onStore = onStore
+        self.upstream = upstream
+        self.maxBytes = maxBytes
+        self.maxAge = maxAge
+        self.lock = threading.Lock()
+        # Fetches still running at close() drop their results
+        self.closed = False
+        # Path -> [lock, number of requests using it], while any are
+        self.fetchLocks = {}
+        self.entries = {}
+        self.totalSize = 0
+
+        os.makedirs(cacheDir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(cacheDir, 'index.db'), check_same_thread=False)
+        csr = self.db.cursor()
+        csr.execute("PRAGMA journal_mode=WAL")
+        for statement in WIKI_CACHE_SCHEMA:
+            csr.execute(statement)
+        csr.execute("SELECT path, file, content_type, etag, last_modified, size, fetched, used"
+                    " FROM entries")
+        for row in csr.fetchall():
+            if os.path.exists(os.path.join(cacheDir, row[1])):
+                self.entries[row[0]] = CacheEntry(*row[1:])
+                self.totalSize += row[5]
+            else:
+                csr.execute("DELETE FROM entries WHERE path=?", (row[0],))
+        self.db.commit()
+
+    def close(self):
+        # Last-use times are only kept in memory until now
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.db.executemany("UPDATE entries SET used=? WHERE path=?",
+                                [(entry.used, path) for path, entry in self.entries.items()])
+            self.db.commit()
+            self.db.close()
+
+    def contains(self, path):
+        with self.lock:
+            return path in self.entries
+
+    def pages(self):
+        # (path, content type) for every cached HTML document
+        with self.lock:
+            return [(path, entry.content_type) for path, entry in self.entries.items()
+                    if (entry.content_type or '').startswith('text/html')]
+
+    def read(self, path):
+        with self.lock:
+            entry = self.entries.get(path)
+        if entry is None:
+            return None
+        return self.readEntry(path, entry)
+
+    def checkPath(self, path):
+        # Only paths on the wiki host may be fetched; something like
+        # "@example.org/x" would otherwise change the host of the URL
+        url = urllib.parse.urlsplit(self.upstream + path)
+        if not path.startswith('/') or url.netloc != urllib.parse.urlsplit(self.upstream).netloc:
+            raise WikiCacheError(400, "Invalid path {!r}".format(path))
+
+    def get(self, path, assets=False):
+        # Returns (content type, body).  With assets set, the page's own
+        # assets are fetched into the cache too.
+        self.checkPath(path)
+        with self.lock:
+            shared = self.fetchLocks.setdefault(path, [threading.Lock(), 0])
+            shared[1] += 1
+
+        # Concurrent requests for the same path share a single fetch
+        try:
+            with shared[0]:
+                contentType, body = self.fetch(path)
+        finally:
+            with self.lock:
+                shared[1] -= 1
+                if not shared[1]:
+                    del self.fetchLocks[path]
+        if assets and contentType and contentType.startswith('text/html'):
+            for asset in pageAssets(body):
+                try:
+                    self.get(asset)
+                except WikiCacheError:
+                    pass
+        return contentType, body
+
+    def fetch(self, path):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                entry.used = now
+        if entry is not None and now - entry.fetched < self.maxAge:
+            body = self.readEntry(path, entry)
+            if body is not None:
+                return entry.content_type, body
+            entry = None
+
+        headers = {'User-Agent': 'gwtrack'}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        try:
+            request = urllib.request.Request(self.upstream + path, headers=headers)
+            with urllib.request.urlopen(request, timeout=WIKI_TIMEOUT) as response:
+                body = response.read()
+                contentType = response.headers.get('Content-Type')
+                self.store(path, response.headers, body)
+            if self.onStore is not None:
+                self.onStore(path, contentType, body)
+            return contentType, body
+        except urllib.error.HTTPError as err:
+            if err.code == 304 and entry is not None:
+                with self.lock:
+                    entry.fetched = now
+                    if not self.closed:
+                        self.db.execute("UPDATE entries SET fetched=? WHERE path=?", (now, path))
+                        self.db.commit()
+            elif entry is None:
+                raise WikiCacheError(err.code, str(err.reason))
+        except (urllib.error.URLError, http.client.HTTPException, OSError) as err:
+            # Includes truncated responses (http.client.IncompleteRead)
+            if entry is None:
+                raise WikiCacheError(502, str(err))
+
+        # Not modified, or the wiki is unavailable: serve the cached copy
+        body = self.readEntry(path, entry)
+        if body is None:
+            raise WikiCacheError(502, "Cached copy of {} is missing".format(path))
+        return entry.content_type, body
+
+    def readEntry(self, path, entry):
+        try:
+            with open(os.path.join(self.cacheDir, entry.file), 'rb') as cf:
+                return cf.read()
+        except OSError:
+            with self.lock:
+                self.dropEntry(path)
+            return None
+
+    def store(self, path, headers, body):
+        fileName = hashlib.sha1(path.encode('utf-8')).hexdigest()
+        fileName = os.path.join(fileName[:2], fileName)
+        fullName = os.path.join(self.cacheDir, fileName)
+        os.makedirs(os.path.dirname(fullName), exist_ok=True)
+        tempName = "{}.{}.tmp".format(fullName, threading.get_ident())
+        with open(tempName, 'wb') as cf:
+            cf.write(body)
+        os.replace(tempName, fullName)
+
+        now = time.time()
+        entry = CacheEntry(fileName, headers.get('Content-Type'), headers.get('ETag'),
+                           headers.get('Last-Modified'), len(body), now, now)
+        with self.lock:
+            if self.closed:
+                return
+            old = self.entries.get(path)
+            if old is not None:
+                self.totalSize -= old.size
+            self.entries[path] = entry
+            self.totalSize += entry.size
+            self.db.execute("REPLACE INTO entries (path, file, content_type, etag,"
+                            " last_modified, size, fetched, used) VALUES (?,?,?,?,?,?,?,?)",
+                            (path, entry.file, entry.content_type, entry.etag,
+                             entry.last_modified, entry.size, entry.fetched, entry.used))
+            self.evict(keep=path)
+            self.db.commit()
+
+    def evict(self, keep=None):
+        # Called with the lock held
+        if self.totalSize <= self.maxBytes:
+            return
+        for path in sorted(self.entries, key=lambda p: self.entries[p].used):
+            if self.totalSize <= self.maxBytes:
+                break
+            if path != keep:
+                self.dropEntry(path)
+
+    def dropEntry(self, path):
+        # Called with the lock held
+        entry = self.entries.pop(path, None)
+        if entry is None or self.closed:
+            return
+        self.totalSize -= entry.size
+        self.db.execute("DELETE FROM entries WHERE path=?", (path,))
+        try:
+            os.remove(os.path.join(self.cacheDir, entry.file))
+        except OSError:
+            pass
+
+
+class WikiRequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            contentType, body = self.server.cache.get(self.path)
+        except WikiCacheError as err:
+            self.send_error(err.status, str(err))
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', contentType or 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serves the wiki from the cache on a local port, so the web view gets
+# pages, images and style sheets through it without any special handling.
+class WikiProxy(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, cache, port=0):
+        super(WikiProxy, self).__init__(('127.0.0.1', port), WikiRequestHandler)
+        self.cache = cache
+        self.thread = None
+
+    def baseUrl(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.shutdown()
+            self.thread = None
+        self.server_close()
+
+
+# Fetches pages into the cache in the background, at most `workers` at a
+# time.  Starting a new batch cancels whatever is left of the previous one.
+# The workers are daemon threads so a slow fetch never holds up exit.
+class WikiPrefetcher:
+    def __init__(self, cache, workers=PREFETCH_WORKERS):
+        self.cache = cache
+        self.queue = queue.Queue()
+        self.generation = 0
+        self.stopped = False
+        self.threads = [threading.Thread(target=self.worker, daemon=True)
+                        for idx in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def prefetch(self, paths):
+        self.cancel()
+        for path in paths:
+            if not self.cache.contains(path):
+                self.queue.put((self.generation, path))
+
+    def worker(self):
+        while True:
+            generation, path = self.queue.get()
+            try:
+                if self.stopped:
+                    return
+                if generation == self.generation:
+                    self.cache.get(path, assets=True)
+            except Exception:
+                # A bad page must not stop the worker
+                pass
+            finally:
+                self.queue.task_done()
+
+    def wait(self):
+        self.queue.join()
+
+    def cancel(self):
+        # Queued paths from older batches are skipped by the workers
+        self.generation += 1
+
+    def shutdown(self, timeout=None):
+        # Waits up to `timeout` seconds for fetches in progress to finish
+        self.stopped = True
+        self.cancel()
+        for thread in self.threads:
+            self.queue.put((None, None))
+        deadline = time.time() + timeout if timeout is not None else None
+        for thread in self.threads:
+            thread.join(max(0, deadline - time.time()) if deadline is not None else None)
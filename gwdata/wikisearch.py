@@ -0,0 +1,201 @@
+import sqlite3
+import threading
+import html.parser
+import urllib.parse
+
+from .consts import WIKI_HOST, WIKI_URL
+from .search import SearchHit, areaItems
+
+WIKI_PATH = WIKI_URL[len(WIKI_HOST):]
+WIKI_SEARCH_LIMIT = 100
+
+WIKI_INDEX_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, slug TEXT NOT NULL UNIQUE)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(title, body,"
+    " tokenize='porter unicode61')",
+]
+
+# Elements whose text is never part of the article
+SKIP_TAGS = ('script', 'style', 'noscript', 'head')
+
+
+class PageTextParser(html.parser.HTMLParser):
+    def __init__(self):
+        super(PageTextParser, self).__init__(convert_charrefs=True)
+        self.title = None
+        self.chunks = []
+        self.skip = 0
+        self.inTitle = False
+        self.contentDepth = 0
+        self.done = False
+        # Used if the page has no article body element
+        self.allChunks = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title':
+            self.inTitle = True
+        elif tag in SKIP_TAGS:
+            self.skip += 1
+        elif tag == 'div':
+            # Only the article body is indexed, not the wiki's navigation.
+            # Divs are the only elements MediaWiki reliably closes, so they
+            # are what's counted to find the end of the article.
+            if self.contentDepth:
+                self.contentDepth += 1
+            elif not self.done and dict(attrs).get('id') == 'mw-content-text':
+                self.contentDepth = 1
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self.inTitle = False
+        elif tag in SKIP_TAGS:
+            self.skip = max(0, self.skip - 1)
+        elif tag == 'div' and self.contentDepth:
+            self.contentDepth -= 1
+            self.done = self.contentDepth == 0
+
+    def handle_data(self, data):
+        if self.inTitle:
+            if self.title is None:
+                self.title = data.split(' - ')[0].strip()
+        elif not self.skip:
+            if self.contentDepth:
+                self.chunks.append(data)
+            self.allChunks.append(data)
+
+def pageText(body):
+    # Returns (title, text) for a wiki page's HTML
+    parser = PageTextParser()
+    try:
+        parser.feed(body.decode('utf-8', 'replace'))
+        parser.close()
+    except Exception:
+        pass
+    chunks = parser.chunks if parser.done or parser.contentDepth else parser.allChunks
+    return parser.title or '', ' '.join(' '.join(chunks).split())
+
+def pageSlug(path):
+    # The wiki page a cache path refers to, or None for assets and such
+    path = path.split('?')[0].split('#')[0]
+    if not path.startswith(WIKI_PATH):
+        return None
+    return urllib.parse.unquote(path[len(WIKI_PATH):])
+
+def slugUrl(slug):
+    return WIKI_URL + urllib.parse.quote(slug, safe="/:()',!*")
+
+def ftsQuery(text):
+    # Quote each word so punctuation can't form FTS5 syntax; the last word
+    # matches as a prefix since it may still be being typed.
+    words = ['"{}"'.format(word.replace('"', '""')) for word in text.split()]
+    if words:
+        words[-1] += '*'
+    return ' '.join(words)
+
+
+class WikiHit:
+    __slots__ = ('slug', 'title', 'snippet', 'items')
+
+    def __init__(self, slug, title, snippet, items):
+        self.slug = slug
+        self.title = title
+        self.snippet = snippet
+        # SearchHits for the catalog entries with this wiki page
+        self.items = items
+
+
+# FTS5 index over the text of the wiki pages in the wiki cache.  Pages are
+# added from the cache's fetch threads, so access is serialized by a lock.
+class WikiIndex:
+    def __init__(self, fileName):
+        self.lock = threading.Lock()
+        self.closed = False
+        self.slugs = {}
+        self.db = sqlite3.connect(fileName, check_same_thread=False)
+        try:
+            csr = self.db.cursor()
+            csr.execute("PRAGMA journal_mode=WAL")
+            csr.execute("PRAGMA synchronous=NORMAL")
+            # Fails if SQLite was built without FTS5
+            for statement in WIKI_INDEX_SCHEMA:
+                csr.execute(statement)
+            self.db.commit()
+        except sqlite3.Error:
+            self.db.close()
+            raise
+
+    def close(self):
+        # Pages added after this are ignored
+        with self.lock:
+            self.closed = True
+            self.db.close()
+
+    def addArea(self, area):
+        # Maps wiki slugs back to catalog entries for search results
+        for row, info in enumerate(areaItems(area)):
+            slug = urllib.parse.unquote(info.wiki)
+            self.slugs.setdefault(slug, []).append(SearchHit(area, row))
+
+    def contains(self, slug):
+        with self.lock:
+            if self.closed:
+                return False
+            csr = self.db.cursor()
+            csr.execute("SELECT 1 FROM docs WHERE slug=?", (slug,))
+            return csr.fetchone() is not None
+
+    def addPage(self, path, contentType, body):
+        slug = pageSlug(path)
+        if slug is None or not (contentType or '').startswith('text/html'):
+            return
+        title, text = pageText(body)
+        if not text:
+            return
+        with self.lock:
+            if self.closed:
+                return
+            csr = self.db.cursor()
+            csr.execute("SELECT id FROM docs WHERE slug=?", (slug,))
+            row = csr.fetchone()
+            if row is None:
+                csr.execute("INSERT INTO docs (slug) VALUES (?)", (slug,))
+                docId = csr.lastrowid
+            else:
+                docId = row[0]
+                csr.execute("DELETE FROM pages WHERE rowid=?", (docId,))
+            csr.execute("INSERT INTO pages (rowid, title, body) VALUES (?, ?, ?)",
+                        (docId, title or slug.replace('_', ' '), text))
+            self.db.commit()
+
+    def addCached(self, cache):
+        # Indexes pages which were cached before they could be indexed
+        for path, contentType in cache.pages():
+            if self.closed:
+                return
+            slug = pageSlug(path)
+            if slug is None or self.contains(slug):
+                continue
+            body = cache.read(path)
+            if body is not None:
+                self.addPage(path, contentType, body)
+
+    def search(self, text, limit=WIKI_SEARCH_LIMIT):
+        query = ftsQuery(text)
+        if not query:
+            return []
+        with self.lock:
+            if self.closed:
+                return []
+            csr = self.db.cursor()
+            try:
+                # Title matches weigh more than matches in the body text
+                csr.execute("SELECT docs.slug, pages.title,"
+                            " snippet(pages, 1, '', '', '...', 12)"
+                            " FROM pages JOIN docs ON docs.id = pages.rowid"
+                            " WHERE pages MATCH ? ORDER BY bm25(pages, 10.0, 1.0) LIMIT ?",
+                            (query, limit))
+                rows = csr.fetchall()
+            except sqlite3.OperationalError:
+                return []
+        return [WikiHit(slug, title, snippet, self.slugs.get(slug, []))
+                for slug, title, snippet in rows]
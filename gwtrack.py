@@ -2,24 +2,109 @@
 
 import os
 import sys
-import yaml
-import sqlite3
 import locale
+import importlib
+import sqlite3
+import threading
 try:
-    from PySide6 import QtCore, QtGui, QtWidgets, QtWebEngineWidgets
+    from PySide6 import QtCore, QtGui, QtWidgets
 except ImportError:
-    from PyQt6 import QtCore, QtGui, QtWidgets, QtWebEngineWidgets
+    from PyQt6 import QtCore, QtGui, QtWidgets
 
 from gwdata.quests import QuestArea
 from gwdata.missions import MissionArea
 from gwdata.skills import SkillArea
 from gwdata.vanquish import VanquishArea
+from gwdata.cache import CatalogCache
+from gwdata.catalog import loadCatalog
+from gwdata.search import SearchIndex, findRewardQuests, areaItems
+from gwdata.wikicache import WikiCache, WikiProxy, WikiPrefetcher
+from gwdata.wikisearch import WikiIndex, WikiHit, slugUrl
+from gwdata.progress import ProgressTracker, STATUS_TITLES, FINISHED_STATES, EXCLUDED_STATES, \
+                            areaStatuses, sumProgress, percent
+from gwdata.compare import compareStatus
+from gwdata.ranks import RankCalculator
+from gwdata.titles import TitleScanner, accountTitles
+from gwdata.history import loadTimeline, campaignCounts
+from gwdata.transfer import TransferError, transferFormat, exportStatus, importStatus
+from gwdata import rewards
+from gwdata.status import *
+from gwdata.chardb import createCharDb, listChars, CharPool
 from gwdata.consts import *
 
 Qt = QtCore.Qt
 
-HOME_BASE = os.getenv('USERPROFILE') or os.getenv('HOME')
-DATA_BASE = os.path.join(HOME_BASE, '.gwtrack')
+SORT_ROLE = Qt.ItemDataRole.UserRole
+
+# Plain int values work as TextAlignmentRole data with both Qt bindings
+ALIGN_RIGHT = Qt.AlignmentFlag.AlignRight.value | Qt.AlignmentFlag.AlignVCenter.value
+ALIGN_CENTER = Qt.AlignmentFlag.AlignHCenter.value | Qt.AlignmentFlag.AlignVCenter.value
+# Tree widget items take the flags themselves
+ITEM_ALIGN_RIGHT = Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+
+# Seconds to wait for background wiki work when closing
+WIKI_SHUTDOWN_WAIT = 1.0
+# Wiki text searches wait this long (ms) for typing to pause
+WIKI_SEARCH_DELAY = 250
+
+TRANSFER_FILTER = "Progress files (*.csv *.json);;All files (*)"
+# Skipped records listed after an import
+TRANSFER_SHOWN = 10
+
+STATE_COLORS = {
+    'Done':     QtGui.QColor(0xC0, 0xE0, 0xC0),
+    'Complete': QtGui.QColor(0xC0, 0xE0, 0xFF),
+    'Active':   QtGui.QColor(0xFF, 0xE0, 0xC0),
+    'N/A':      QtGui.QColor(0xE0, 0xE0, 0xE0),
+    'Master':   QtGui.QColor(0xC0, 0xE0, 0xC0),
+    'Expert':   QtGui.QColor(0xFF, 0xE0, 0xC0),
+    'Standard': QtGui.QColor(0xFF, 0xFF, 0xC0),
+    'Known':    QtGui.QColor(0xC0, 0xE0, 0xC0),
+    'Unlocked': QtGui.QColor(0xC0, 0xE0, 0xFF),
+}
+
+
+def loadWebEngine():
+    # QtWebEngineWidgets starts Chromium as soon as it's used, so it is only
+    # imported once a wiki page actually needs to be shown.
+    binding = QtCore.__name__.rsplit('.', 1)[0]
+    return importlib.import_module(binding + '.QtWebEngineWidgets')
+
+
+# Coalesces wiki page requests, so holding an arrow key down in a list only
+# loads the page the selection stops on.
+class WikiNavigator(QtCore.QObject):
+    def __init__(self, parent, loadFunc, cancelFunc, delay=200):
+        super(WikiNavigator, self).__init__(parent)
+        self.loadFunc = loadFunc
+        self.cancelFunc = cancelFunc
+        self.pendingUrl = None
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.loadPending)
+
+    def navigate(self, url, immediate=False):
+        self.pendingUrl = url
+        if immediate:
+            self.loadPending()
+        else:
+            # Abandon the page still loading for an earlier row, rather than
+            # letting it finish in the background
+            if not self.timer.isActive():
+                self.cancelFunc()
+            self.timer.start()
+
+    def cancel(self):
+        self.timer.stop()
+        self.pendingUrl = None
+
+    def loadPending(self):
+        self.timer.stop()
+        url = self.pendingUrl
+        self.pendingUrl = None
+        if url is not None:
+            self.loadFunc(url)
 
 
 class IconProvider:
@@ -65,6 +150,577 @@ class IconProvider:
         except KeyError:
             return QtGui.QIcon()
 
+def formatNum(value, hm_value = None):
+    text = '---'
+    if value:
+        text = locale.format_string("%d", value, grouping=True)
+    if hm_value:
+        text += ' ({})'.format(formatNum(hm_value))
+    return text
+
+
+def wikiUrl(wiki):
+    return QtCore.QUrl.fromEncoded(bytes(WIKI_URL + wiki, 'utf-8'))
+
+
+def areaLabel(area):
+    if isinstance(area, QuestArea):
+        return area.name
+    return "{} {}".format(area.name, area.treeTitle())
+
+
+class CatalogProxy(QtCore.QSortFilterProxyModel):
+    def __init__(self, parent):
+        super(CatalogProxy, self).__init__(parent)
+        self.rowMask = None
+
+    def setRowMask(self, rowMask):
+        # Bit N of rowMask set means source row N is shown
+        if rowMask == self.rowMask:
+            return
+        self.rowMask = rowMask
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, sourceRow, sourceParent):
+        if self.rowMask is None:
+            return True
+        return (self.rowMask >> sourceRow) & 1 != 0
+
+
+class CatalogModel(QtCore.QAbstractTableModel):
+    headers = []
+    statusColumns = ()
+
+    def __init__(self, parent):
+        super(CatalogModel, self).__init__(parent)
+        self.area = None
+        self.rows = []
+        self.statusMap = {}
+
+    def areaRows(self, area):
+        # Overridden for each kind of area
+        return []
+
+    def setArea(self, area, statusMap):
+        if area is self.area:
+            # Same area for another character: only the status columns change
+            self.statusMap = statusMap
+            if self.rows:
+                self.dataChanged.emit(self.index(0, min(self.statusColumns)),
+                                      self.index(len(self.rows) - 1, max(self.statusColumns)))
+            return
+
+        self.beginResetModel()
+        self.area = area
+        self.rows = self.areaRows(area) if area is not None else []
+        self.statusMap = statusMap
+        self.endResetModel()
+
+    def rowsChanged(self, rows):
+        lastColumn = self.columnCount() - 1
+        for row in rows:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, lastColumn))
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        info = self.rows[index.row()]
+        if role == SORT_ROLE:
+            value = self.sortValue(info, index.column())
+            if value is None:
+                value = self.cellData(info, index.column(), Qt.ItemDataRole.DisplayRole)
+            return value if value is not None else ''
+        return self.cellData(info, index.column(), role)
+
+    def sortValue(self, info, column):
+        return None
+
+    def statusData(self, info, status, role):
+        state = self.statusMap.get(statusKey(status, self.area.name, info.name))
+        if role == Qt.ItemDataRole.DisplayRole:
+            return state
+        elif role == Qt.ItemDataRole.BackgroundRole:
+            return STATE_COLORS.get(state)
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            return ALIGN_CENTER
+        return None
+
+
+class QuestModel(CatalogModel):
+    headers = ["Quest", "Type", "R", "Profession", "Character", "XP", "Reward", "Status"]
+    statusColumns = (7,)
+
+    def __init__(self, parent):
+        super(QuestModel, self).__init__(parent)
+        self.fixed_font = None
+
+    def areaRows(self, area):
+        return area.quests
+
+    def sortValue(self, quest, column):
+        if column == 2:
+            return int(quest.repeat)
+        elif column == 5:
+            return quest.xp
+        return None
+
+    def cellData(self, quest, column, role):
+        if column == 7:
+            return self.statusData(quest, STATUS_QUEST, role)
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return quest.name
+            elif column == 1:
+                return quest.quest_type
+            elif column == 3 and quest.profession is not None:
+                prof = quest.profession
+                if quest.profession_lock == PROFESSION_PRIMARY:
+                    prof += " (P)"
+                elif quest.profession_lock == PROFESSION_UNLOCKED:
+                    prof = "({})".format(quest.profession)
+                return prof
+            elif column == 4:
+                return quest.char_type
+            elif column == 5:
+                return formatNum(quest.xp)
+            elif column == 6:
+                return quest.rewardString()
+        elif role == Qt.ItemDataRole.DecorationRole:
+            if column == 1 and quest.quest_type == 'Primary':
+                return IconProvider.icon('q_pri')
+            elif column == 2 and quest.repeat:
+                return IconProvider.icon('q_rep')
+            elif column == 3 and quest.profession is not None:
+                return IconProvider.icon(quest.profession)
+            elif column == 4 and quest.char_type is not None:
+                return IconProvider.icon(quest.char_type)
+        elif role == Qt.ItemDataRole.StatusTipRole:
+            if column == 2 and quest.repeat:
+                return "Repeatable"
+            elif column == 6:
+                return quest.rewardTip()
+        elif role == Qt.ItemDataRole.FontRole:
+            if column == 6:
+                return self.fixed_font
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            if column == 5:
+                return ALIGN_RIGHT
+        return None
+
+
+class MissionModel(CatalogModel):
+    headers = ["Mission", "Rank Type", "Rank", "ZM XP", "ZM Rank", "ZM Coins",
+               "Status", "Hard Mode"]
+    statusColumns = (6, 7)
+
+    def areaRows(self, area):
+        return area.missions
+
+    def sortValue(self, mission, column):
+        if column == 2:
+            return mission.rank
+        elif column == 3:
+            return mission.z_xp
+        elif column == 4:
+            return mission.z_rank
+        elif column == 5:
+            return mission.z_coins
+        return None
+
+    def cellData(self, mission, column, role):
+        if column == 6:
+            return self.statusData(mission, STATUS_MISSION, role)
+        elif column == 7:
+            return self.statusData(mission, STATUS_MISSION_HM, role)
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return mission.name
+            elif column == 1:
+                return mission.rank_type
+            elif column == 2:
+                return formatNum(mission.rank, mission.hm_rank)
+            elif column == 3:
+                return formatNum(mission.z_xp)
+            elif column == 4:
+                return formatNum(mission.z_rank)
+            elif column == 5:
+                return formatNum(mission.z_coins)
+        elif role == Qt.ItemDataRole.DecorationRole:
+            if column == 1:
+                return IconProvider.icon(mission.rank_type)
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            if column in (2, 3, 4, 5):
+                return ALIGN_RIGHT
+        return None
+
+
+class SkillModel(CatalogModel):
+    headers = ["Elite Skill", "Profession", "Attribute", "Status"]
+    statusColumns = (3,)
+
+    def areaRows(self, area):
+        return area.skills
+
+    def cellData(self, skill, column, role):
+        if column == 3:
+            return self.statusData(skill, STATUS_SKILL, role)
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return skill.name
+            elif column == 1:
+                return skill.profession if skill.profession is not None else '---'
+            elif column == 2:
+                return skill.attribute if skill.attribute is not None else '---'
+        elif role == Qt.ItemDataRole.DecorationRole:
+            if column == 1 and skill.profession is not None:
+                return IconProvider.icon(skill.profession)
+        return None
+
+
+class VanquishModel(CatalogModel):
+    headers = ["Explorable Area", "Foes", "Bonus Rank", "ZV XP", "ZV Rank",
+               "ZV Rank Type", "ZV Coins", "Status"]
+    statusColumns = (7,)
+
+    def areaRows(self, area):
+        return area.areas
+
+    def sortValue(self, vq_area, column):
+        if column == 1:
+            return vq_area.max_foes
+        elif column == 3:
+            return vq_area.z_xp
+        elif column == 4:
+            return vq_area.z_rank
+        elif column == 6:
+            return vq_area.z_coins
+        return None
+
+    def cellData(self, vq_area, column, role):
+        if column == 7:
+            return self.statusData(vq_area, STATUS_VANQUISH, role)
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return vq_area.name
+            elif column == 1:
+                return '{} - {}'.format(vq_area.min_foes, vq_area.max_foes)
+            elif column == 2:
+                return vq_area.rank_type
+            elif column == 3:
+                return formatNum(vq_area.z_xp)
+            elif column == 4:
+                return formatNum(vq_area.z_rank)
+            elif column == 5:
+                return vq_area.z_rank_type
+            elif column == 6:
+                return formatNum(vq_area.z_coins)
+        elif role == Qt.ItemDataRole.DecorationRole:
+            if column == 2:
+                return IconProvider.icon(vq_area.rank_type)
+            elif column == 5:
+                return IconProvider.icon(vq_area.z_rank_type)
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            if column in (1, 3, 4, 6):
+                return ALIGN_RIGHT
+        return None
+
+
+class CompareModel(QtCore.QAbstractTableModel):
+    def __init__(self, parent, area, charNames, results):
+        super(CompareModel, self).__init__(parent)
+        self.rows = areaItems(area)
+        self.columns = [(idx, status) for idx in range(len(charNames))
+                        for status in areaStatuses(area)]
+        self.charNames = charNames
+        self.results = results
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.columns) + 1
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation != Qt.Orientation.Horizontal or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if section == 0:
+            return "Name"
+        idx, status = self.columns[section - 1]
+        if status == STATUS_MISSION_HM:
+            return "{} (HM)".format(self.charNames[idx])
+        return self.charNames[idx]
+
+    def state(self, row, column):
+        idx, status = self.columns[column - 1]
+        return self.results[idx].get((status, self.rows[row].name))
+
+    def unfinishedMask(self):
+        # Rows which at least one character still has left to do
+        mask = 0
+        for row in range(len(self.rows)):
+            for column in range(1, len(self.columns) + 1):
+                status = self.columns[column - 1][1]
+                state = self.state(row, column)
+                if state not in FINISHED_STATES[status] and state not in EXCLUDED_STATES.get(status, ()):
+                    mask |= 1 << row
+                    break
+        return mask
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        if index.column() == 0:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return self.rows[index.row()].name
+            return None
+
+        state = self.state(index.row(), index.column())
+        if role == Qt.ItemDataRole.DisplayRole:
+            return state
+        elif role == Qt.ItemDataRole.BackgroundRole:
+            return STATE_COLORS.get(state)
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            return ALIGN_CENTER
+        return None
+
+
+class CompareDialog(QtWidgets.QDialog):
+    def __init__(self, parent, area, charNames, results):
+        super(CompareDialog, self).__init__(parent)
+        self.setWindowTitle("Compare Characters - {}".format(areaLabel(area)))
+
+        layout = QtWidgets.QGridLayout(self)
+        layout.setContentsMargins(8, 8, 8, 8)
+        self.model = CompareModel(self, area, charNames, results)
+        self.view = QtWidgets.QTableView(self)
+        proxy = CatalogProxy(self.view)
+        proxy.setSourceModel(self.model)
+        self.view.setModel(proxy)
+        self.view.setSortingEnabled(True)
+        self.view.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.view.verticalHeader().setVisible(False)
+        self.view.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.view.resizeColumnsToContents()
+        layout.addWidget(self.view, 0, 0, 1, 2)
+        self.unfinishedOnly = QtWidgets.QCheckBox("Unfinished only", self)
+        layout.addWidget(self.unfinishedOnly, 1, 0)
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.StandardButton.Close)
+        layout.addWidget(buttons, 1, 1)
+
+        self.unfinishedOnly.toggled.connect(self.onFilterChanged)
+        buttons.rejected.connect(self.reject)
+
+    def sizeHint(self):
+        return QtCore.QSize(900, 600)
+
+    def onFilterChanged(self, checked):
+        self.view.model().setRowMask(self.model.unfinishedMask() if checked else None)
+
+
+class TitleDialog(QtWidgets.QDialog):
+    def __init__(self, parent, titles):
+        super(TitleDialog, self).__init__(parent)
+        self.setWindowTitle("Account Titles")
+
+        layout = QtWidgets.QGridLayout(self)
+        layout.setContentsMargins(8, 8, 8, 8)
+        self.view = QtWidgets.QTreeWidget(self)
+        self.view.setColumnCount(3)
+        self.view.setHeaderLabels(["Title", "Completed", "Characters"])
+        for progress in titles:
+            titleItem = QtWidgets.QTreeWidgetItem(self.view)
+            titleItem.setText(0, "{} - {}".format(progress.title, progress.area.name))
+            titleItem.setText(1, "{} / {} ({:.0f}%)".format(
+                              progress.done(), progress.total(),
+                              percent(progress.done(), progress.total())))
+            titleItem.setTextAlignment(1, ITEM_ALIGN_RIGHT)
+            counts = progress.charCounts()
+            titleItem.setText(2, ", ".join("{} ({})".format(name, count)
+                                           for name, count in sorted(counts.items(),
+                                                                     key=lambda c: -c[1])))
+            for item in sorted(progress.holders):
+                holders = progress.holders[item]
+                child = QtWidgets.QTreeWidgetItem(titleItem)
+                child.setText(0, item)
+                child.setText(2, ", ".join(holders))
+                if holders:
+                    child.setBackground(0, STATE_COLORS['Done'])
+        self.view.setColumnWidth(0, 300)
+        self.view.setColumnWidth(1, 120)
+        layout.addWidget(self.view, 0, 0)
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.StandardButton.Close)
+        layout.addWidget(buttons, 1, 0)
+
+        buttons.rejected.connect(self.reject)
+
+    def sizeHint(self):
+        return QtCore.QSize(800, 600)
+
+
+class TimelineChart(QtWidgets.QWidget):
+    MAX_BAR_WIDTH = 60
+
+    def __init__(self, parent):
+        super(TimelineChart, self).__init__(parent)
+        self.bars = []
+        self.setMinimumHeight(160)
+
+    def setBars(self, bars):
+        # [(label, value)], drawn left to right
+        self.bars = bars
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), self.palette().base())
+        if not self.bars:
+            return
+        metrics = painter.fontMetrics()
+        labelHeight = metrics.height() + 4
+        chartHeight = self.height() - 2 * labelHeight
+        peak = max(max(value for label, value in self.bars), 1)
+        width = min(self.width() / len(self.bars), self.MAX_BAR_WIDTH)
+        for idx, (label, value) in enumerate(self.bars):
+            left = int(idx * width)
+            barHeight = int(chartHeight * max(value, 0) / peak)
+            rect = QtCore.QRect(left + 2, labelHeight + chartHeight - barHeight,
+                                max(int(width) - 4, 1), barHeight)
+            painter.fillRect(rect, STATE_COLORS['Done'].darker(120))
+            painter.drawText(QtCore.QRect(left, rect.top() - labelHeight, int(width), labelHeight),
+                             Qt.AlignmentFlag.AlignCenter, str(value))
+            if metrics.horizontalAdvance(label) < width:
+                painter.drawText(QtCore.QRect(left, self.height() - labelHeight, int(width),
+                                              labelHeight),
+                                 Qt.AlignmentFlag.AlignCenter, label)
+
+
+class TimelineDialog(QtWidgets.QDialog):
+    # Number of periods shown in the chart
+    CHART_PERIODS = 14
+
+    def __init__(self, parent, db, areas):
+        super(TimelineDialog, self).__init__(parent)
+        self.setWindowTitle("Progress Timeline")
+        self.db = db
+        self.areas = areas
+
+        layout = QtWidgets.QGridLayout(self)
+        layout.setContentsMargins(8, 8, 8, 8)
+        self.period = QtWidgets.QComboBox(self)
+        self.period.addItems(["Daily", "Weekly"])
+        layout.addWidget(self.period, 0, 0)
+        self.grouping = QtWidgets.QComboBox(self)
+        self.grouping.addItems(["By Campaign", "By Area"])
+        layout.addWidget(self.grouping, 0, 1)
+        layout.setColumnStretch(2, 1)
+        self.chart = TimelineChart(self)
+        layout.addWidget(self.chart, 1, 0, 1, 3)
+        self.view = QtWidgets.QTreeWidget(self)
+        self.view.setColumnCount(2)
+        self.view.setHeaderLabels(["Period", "Finished"])
+        self.view.setColumnWidth(0, 320)
+        layout.addWidget(self.view, 2, 0, 1, 3)
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.StandardButton.Close)
+        layout.addWidget(buttons, 3, 0, 1, 3)
+
+        self.period.currentIndexChanged.connect(self.refresh)
+        self.grouping.currentIndexChanged.connect(self.refresh)
+        buttons.rejected.connect(self.reject)
+        self.refresh()
+
+    def sizeHint(self):
+        return QtCore.QSize(640, 600)
+
+    def refresh(self):
+        weekly = self.period.currentIndex() == 1
+        byArea = self.grouping.currentIndex() == 1
+        timeline = loadTimeline(self.db, weekly)
+
+        self.view.clear()
+        for start, counts in reversed(timeline):
+            if byArea:
+                groups = {"{} - {}".format(STATUS_TITLES[status], areaName): done
+                          for (status, areaName), done in counts.items()}
+            else:
+                groups = campaignCounts(counts, self.areas)
+            periodItem = QtWidgets.QTreeWidgetItem(self.view)
+            periodItem.setText(0, ("Week of {}" if weekly else "{}").format(start.isoformat()))
+            periodItem.setText(1, str(sum(counts.values())))
+            periodItem.setTextAlignment(1, ITEM_ALIGN_RIGHT)
+            for name in sorted(groups):
+                child = QtWidgets.QTreeWidgetItem(periodItem)
+                child.setText(0, name)
+                child.setText(1, str(groups[name]))
+                child.setTextAlignment(1, ITEM_ALIGN_RIGHT)
+
+        self.chart.setBars([(start.strftime("%m/%d"), sum(counts.values()))
+                            for start, counts in timeline[-self.CHART_PERIODS:]])
+
+
+class RankView(QtWidgets.QTreeWidget):
+    def __init__(self, parent):
+        super(RankView, self).__init__(parent)
+        self.setRootIsDecorated(False)
+        self.setColumnCount(5)
+        self.setHeaderLabels(["Remaining", "Normal", "Hard", "Zaishen", "Total"])
+        self.rankItems = {}
+        self.xpItem = self.addRow("Zaishen XP")
+        self.coinItem = self.addRow("Zaishen Coins")
+
+    def addRow(self, title, index=None):
+        item = QtWidgets.QTreeWidgetItem()
+        item.setText(0, title)
+        for column in range(1, 5):
+            item.setTextAlignment(column, ITEM_ALIGN_RIGHT)
+        if index is None:
+            self.addTopLevelItem(item)
+        else:
+            self.insertTopLevelItem(index, item)
+        return item
+
+    def setTotals(self, totals):
+        # Rank types come from the catalog, so their rows are added as
+        # they're first seen, above the Zaishen XP and coin rows
+        if totals is not None:
+            for rankType in totals.ranks:
+                if rankType not in self.rankItems:
+                    self.rankItems[rankType] = self.addRow(rankType, len(self.rankItems))
+            self.resizeColumnToContents(0)
+
+        for rankType, item in self.rankItems.items():
+            points = totals.ranks[rankType] if totals is not None else None
+            for column in range(3):
+                item.setText(column + 1, formatNum(points[column]) if points else "")
+            item.setText(4, formatNum(sum(points)) if points else "")
+        self.xpItem.setText(4, formatNum(totals.z_xp) if totals is not None else "")
+        self.coinItem.setText(4, formatNum(totals.z_coins) if totals is not None else "")
+
+
 class AddCharDialog(QtWidgets.QDialog):
     def __init__(self, parent):
         super(AddCharDialog, self).__init__(parent)
@@ -123,16 +779,22 @@ class TrackGui(QtWidgets.QMainWindow):
         split = QtWidgets.QSplitter(base)
         vsplit = QtWidgets.QSplitter(split)
         vsplit.setOrientation(Qt.Orientation.Vertical)
-        self.areaView = QtWidgets.QTreeWidget(split)
+        self.areaStack = QtWidgets.QStackedWidget(split)
+        self.areaView = QtWidgets.QTreeWidget(self.areaStack)
         self.areaView.setRootIsDecorated(True)
         self.areaView.setHeaderHidden(True)
+        self.areaView.setColumnCount(2)
+        self.areaView.header().setStretchLastSection(False)
+        self.areaView.header().setSectionResizeMode(0, QtWidgets.QHeaderView.ResizeMode.Stretch)
+        self.areaView.header().setSectionResizeMode(1, QtWidgets.QHeaderView.ResizeMode.ResizeToContents)
+        self.areaStack.addWidget(self.areaView)
+        self.searchResults = QtWidgets.QListWidget(self.areaStack)
+        self.areaStack.addWidget(self.searchResults)
         self.qlistStack = QtWidgets.QStackedWidget(vsplit)
 
-        self.questView = QtWidgets.QTreeWidget(self.qlistStack)
-        self.questView.setRootIsDecorated(False)
-        self.questView.setHeaderLabels(["Quest", "Type", "R", "Profession",
-                                        "Character", "XP", "Reward", "Status"])
-        metrics = QtGui.QFontMetrics(self.questView.headerItem().font(0))
+        self.questModel = QuestModel(self)
+        self.questView = self.createListView(self.questModel)
+        metrics = QtGui.QFontMetrics(self.questView.header().font())
         self.questView.setColumnWidth(0, 240)
         self.questView.setColumnWidth(1, metrics.boundingRect("Mini-mission").width() + 10)
         self.questView.setColumnWidth(2, 20)
@@ -140,26 +802,21 @@ class TrackGui(QtWidgets.QMainWindow):
         self.questView.setColumnWidth(4, metrics.boundingRect("Canthan").width() + 30)
         self.questView.setColumnWidth(5, metrics.boundingRect("50,000").width() + 10)
         self.questView.setColumnWidth(7, metrics.boundingRect("Complete").width() + 10)
-        self.qlistStack.addWidget(self.questView)
 
-        fontSize = self.questView.headerItem().font(0).pointSize()
+        fontSize = self.questView.header().font().pointSize()
         if sys.platform == 'darwin':
             self.fixed_font = QtGui.QFont('Menlo', fontSize)
         elif os.name == 'nt':
             self.fixed_font = QtGui.QFont('Courier New', fontSize)
         else:
             self.fixed_font = QtGui.QFont('Monospace', fontSize)
+        self.questModel.fixed_font = self.fixed_font
         metrics = QtGui.QFontMetrics(self.fixed_font)
         self.questView.setColumnWidth(6, metrics.boundingRect("XXXXXXXXXX").width() + 10)
-        self.questView.header().setSortIndicator(0, Qt.SortOrder.AscendingOrder)
-        self.questView.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-
-        self.missionView = QtWidgets.QTreeWidget(self.qlistStack)
-        self.missionView.setRootIsDecorated(False)
-        self.missionView.setHeaderLabels(["Mission", "Rank Type", "Rank",
-                                          "ZM XP", "ZM Rank", "ZM Coins",
-                                          "Status", "Hard Mode"])
-        metrics = QtGui.QFontMetrics(self.missionView.headerItem().font(0))
+
+        self.missionModel = MissionModel(self)
+        self.missionView = self.createListView(self.missionModel)
+        metrics = QtGui.QFontMetrics(self.missionView.header().font())
         self.missionView.setColumnWidth(0, 260)
         self.missionView.setColumnWidth(1, metrics.boundingRect("Lightbringer").width() + 40)
         self.missionView.setColumnWidth(2, metrics.boundingRect("--- (100)").width() + 10)
@@ -168,31 +825,18 @@ class TrackGui(QtWidgets.QMainWindow):
         self.missionView.setColumnWidth(5, metrics.boundingRect("ZM Coins").width() + 20)
         self.missionView.setColumnWidth(6, metrics.boundingRect("Standard").width() + 30)
         self.missionView.setColumnWidth(7, metrics.boundingRect("Standard").width() + 30)
-        self.qlistStack.addWidget(self.missionView)
-
-        self.missionView.header().setSortIndicator(0, Qt.SortOrder.AscendingOrder)
-        self.missionView.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
 
-        self.skillView = QtWidgets.QTreeWidget(self.qlistStack)
-        self.skillView.setRootIsDecorated(False)
-        self.skillView.setHeaderLabels(["Elite Skill", "Profession", "Attribute",
-                                        "Status"])
-        metrics = QtGui.QFontMetrics(self.skillView.headerItem().font(0))
+        self.skillModel = SkillModel(self)
+        self.skillView = self.createListView(self.skillModel)
+        metrics = QtGui.QFontMetrics(self.skillView.header().font())
         self.skillView.setColumnWidth(0, 300)
         self.skillView.setColumnWidth(1, metrics.boundingRect("Necromancer").width() + 40)
         self.skillView.setColumnWidth(2, metrics.boundingRect("Wilderness Survival").width() + 20)
         self.skillView.setColumnWidth(3, metrics.boundingRect("Unlocked").width() + 30)
-        self.qlistStack.addWidget(self.skillView)
 
-        self.skillView.header().setSortIndicator(0, Qt.SortOrder.AscendingOrder)
-        self.skillView.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-
-        self.vanquishView = QtWidgets.QTreeWidget(self.qlistStack)
-        self.vanquishView.setRootIsDecorated(False)
-        self.vanquishView.setHeaderLabels(["Explorable Area", "Foes", "Bonus Rank",
-                                           "ZV XP", "ZV Rank", "ZV Rank Type",
-                                           "ZV Coins", "Status"])
-        metrics = QtGui.QFontMetrics(self.vanquishView.headerItem().font(0))
+        self.vanquishModel = VanquishModel(self)
+        self.vanquishView = self.createListView(self.vanquishModel)
+        metrics = QtGui.QFontMetrics(self.vanquishView.header().font())
         self.vanquishView.setColumnWidth(0, 240)
         self.vanquishView.setColumnWidth(1, metrics.boundingRect("999 - 999").width() + 10)
         self.vanquishView.setColumnWidth(2, metrics.boundingRect("Lightbringer").width() + 40)
@@ -201,10 +845,6 @@ class TrackGui(QtWidgets.QMainWindow):
         self.vanquishView.setColumnWidth(5, metrics.boundingRect("Lightbringer").width() + 40)
         self.vanquishView.setColumnWidth(6, metrics.boundingRect("ZV Coins").width() + 20)
         self.vanquishView.setColumnWidth(7, metrics.boundingRect("Done").width() + 30)
-        self.qlistStack.addWidget(self.vanquishView)
-
-        self.vanquishView.header().setSortIndicator(0, Qt.SortOrder.AscendingOrder)
-        self.vanquishView.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
 
         wikiPane = QtWidgets.QWidget(vsplit)
         wikiLayout = QtWidgets.QGridLayout(wikiPane)
@@ -219,19 +859,32 @@ class TrackGui(QtWidgets.QMainWindow):
                                                           QtWidgets.QSizePolicy.Policy.Fixed))
         wikiToolbar.addWidget(self.location)
         self.refresh = wikiToolbar.addAction(QtGui.QIcon("icons/view-refresh.png"), "Refresh")
+        wikiToolbar.addSeparator()
+        self.externalWiki = wikiToolbar.addAction("External Browser")
+        self.externalWiki.setCheckable(True)
+        self.externalWiki.setToolTip("Open wiki pages in the system web browser")
         wikiFrame = QtWidgets.QFrame(wikiPane)
         frameLayout = QtWidgets.QGridLayout(wikiFrame)
         frameLayout.setContentsMargins(0, 0, 0, 0)
         wikiFrame.setFrameShape(QtWidgets.QFrame.Shape.StyledPanel)
         wikiFrame.setFrameShadow(QtWidgets.QFrame.Shadow.Sunken)
-        self.wikiView = QtWebEngineWidgets.QWebEngineView(wikiFrame)
-        frameLayout.addWidget(self.wikiView, 0, 0)
+
+        # The web view is created on the first page load; until then (and in
+        # external browser mode) a placeholder takes its place.
+        self.wikiStack = QtWidgets.QStackedWidget(wikiFrame)
+        self.wikiPlaceholder = QtWidgets.QLabel(self.wikiStack)
+        self.wikiPlaceholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.wikiPlaceholder.setWordWrap(True)
+        self.wikiStack.addWidget(self.wikiPlaceholder)
+        self.wikiView = None
+        self.wikiNavigator = WikiNavigator(self, self.showWiki, self.stopWiki)
+        frameLayout.addWidget(self.wikiStack, 0, 0)
         wikiLayout.addWidget(wikiToolbar, 0, 0)
         wikiLayout.addWidget(wikiFrame, 1, 0)
 
         vsplit.addWidget(self.qlistStack)
         vsplit.addWidget(wikiPane)
-        split.addWidget(self.areaView)
+        split.addWidget(self.areaStack)
         split.addWidget(vsplit)
         layout.addWidget(split, 0, 0)
         self.setCentralWidget(base)
@@ -263,36 +916,212 @@ class TrackGui(QtWidgets.QMainWindow):
             action.triggered.connect(lambda checked=False, prof=prof: self.updateProfession2(prof))
         self.prof2Select.setMenu(profMenu)
 
+        toolbar.addSeparator()
+        self.undoAction = toolbar.addAction("Undo")
+        self.undoAction.setShortcut(QtGui.QKeySequence.StandardKey.Undo)
+        self.undoAction.setEnabled(False)
+        self.redoAction = toolbar.addAction("Redo")
+        self.redoAction.setShortcut(QtGui.QKeySequence.StandardKey.Redo)
+        self.redoAction.setEnabled(False)
+
+        toolbar.addSeparator()
+        self.eligibleOnly = toolbar.addAction("Eligible Only")
+        self.eligibleOnly.setCheckable(True)
+        self.eligibleOnly.setToolTip("Only show quests this character can take")
+        self.compareChars = toolbar.addAction("Compare")
+        self.compareChars.setToolTip("Compare every character's progress in the selected area")
+        self.compareChars.setEnabled(False)
+
+        # Rank points and Zaishen rewards the character has yet to earn
+        self.rankDock = QtWidgets.QDockWidget("Remaining Rewards", self)
+        self.rankDock.setObjectName("RankDock")
+        self.rankView = RankView(self.rankDock)
+        self.rankDock.setWidget(self.rankView)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.rankDock)
+        self.rankDock.hide()
+        self.showRanks = self.rankDock.toggleViewAction()
+        self.showRanks.setText("Ranks")
+        self.showRanks.setToolTip("Show the rank points and Zaishen rewards still available")
+        toolbar.addAction(self.showRanks)
+        self.showTitles = toolbar.addAction("Titles")
+        self.showTitles.setToolTip("Show title progress across all characters")
+        self.showTimeline = toolbar.addAction("Timeline")
+        self.showTimeline.setToolTip("Show what this character finished over time")
+        self.showTimeline.setEnabled(False)
+        self.transfer = QtWidgets.QToolButton(self)
+        self.transfer.setText("Import/Export")
+        self.transfer.setPopupMode(QtWidgets.QToolButton.ToolButtonPopupMode.InstantPopup)
+        transferMenu = QtWidgets.QMenu(self)
+        self.importAction = transferMenu.addAction("Import Progress...")
+        self.exportAction = transferMenu.addAction("Export Progress...")
+        self.transfer.setMenu(transferMenu)
+        self.transfer.setEnabled(False)
+        toolbar.addWidget(self.transfer)
+
+        self.rewardSelect = QtWidgets.QToolButton(self)
+        self.rewardSelect.setText("Rewards")
+        self.rewardSelect.setToolTip("Find unfinished quests which grant the selected rewards")
+        self.rewardSelect.setPopupMode(QtWidgets.QToolButton.ToolButtonPopupMode.InstantPopup)
+        rewardMenu = QtWidgets.QMenu(self)
+        self.rewardActions = []
+        for reward_type in range(REWARD_MAX):
+            action = rewardMenu.addAction(rewards.REWARD_TEXT[reward_type])
+            action.setCheckable(True)
+            action.toggled.connect(self.onRewardFilterChanged)
+            self.rewardActions.append(action)
+        self.rewardSelect.setMenu(rewardMenu)
+        toolbar.addWidget(self.rewardSelect)
+
+        toolbar.addSeparator()
+        self.searchBox = QtWidgets.QLineEdit(self)
+        self.searchBox.setPlaceholderText("Search quests, missions, skills...")
+        self.searchBox.setClearButtonEnabled(True)
+        self.searchBox.setMaximumWidth(300)
+        toolbar.addWidget(self.searchBox)
+        self.wikiSearch = toolbar.addAction("Wiki Text")
+        self.wikiSearch.setCheckable(True)
+        self.wikiSearch.setToolTip("Search the text of wiki pages which have been viewed or prefetched")
+
         self.questAreas = {}
         self.missionAreas = {}
         self.skillAreas = {}
         self.vanquishAreas = {}
+        self.searchIndex = SearchIndex()
+        self.searchHits = []
+        self.progress = ProgressTracker()
+        self.ranks = RankCalculator()
+        self.rankStatus = None
+        self.areaNodes = {}
+        self.groupNodes = {}
         self.currentArea = None
+        self.prefetchArea = None
+        self.charPool = CharPool()
+        self.titleScanner = TitleScanner()
+        self.session = None
         self.currentChar = None
+        self.charType = None
+        self.profession = None
+        self.profession2 = None
+        self.statusJournal = None
+        self.statusMap = {}
         self.currentCharIdx = -1
+        self.settings = QtCore.QSettings(os.path.join(DATA_BASE, 'gwtrack.ini'),
+                                         QtCore.QSettings.Format.IniFormat)
+        self.externalWiki.setChecked(self.settings.value('ExternalWiki', 'false') == 'true')
+        self.updateWikiMode()
+
+        # The embedded view loads the wiki through a local caching proxy
+        self.wikiCache = WikiCache(os.path.join(DATA_BASE, 'wiki'))
+        self.wikiProxy = WikiProxy(self.wikiCache)
+        self.wikiProxy.start()
+        self.wikiPrefetch = WikiPrefetcher(self.wikiCache)
+
+        # Cached pages are indexed for full text search as they arrive;
+        # anything cached before that is picked up in the background
+        self.wikiIndex = None
+        self.wikiIndexThread = None
+        try:
+            self.wikiIndex = WikiIndex(os.path.join(DATA_BASE, 'wiki', 'search.db'))
+        except sqlite3.OperationalError:
+            # SQLite was built without FTS5
+            self.wikiSearch.setEnabled(False)
+            self.wikiSearch.setToolTip("Wiki text search needs SQLite with FTS5")
+        else:
+            self.wikiCache.onStore = self.wikiIndex.addPage
+            self.wikiIndexThread = threading.Thread(target=self.wikiIndex.addCached,
+                                                    args=(self.wikiCache,), daemon=True)
+            self.wikiIndexThread.start()
+
+        # Status changes are committed in groups shortly after the last edit
+        self.flushTimer = QtCore.QTimer(self)
+        self.flushTimer.setSingleShot(True)
+        self.flushTimer.setInterval(500)
+        self.flushTimer.timeout.connect(self.flushStatus)
+
+        # Long catalog searches are finished a budget at a time while idle
+        self.searchTimer = QtCore.QTimer(self)
+        self.searchTimer.setSingleShot(True)
+        self.searchTimer.setInterval(0)
+        self.searchTimer.timeout.connect(self.onSearchMore)
+
+        self.wikiSearchTimer = QtCore.QTimer(self)
+        self.wikiSearchTimer.setSingleShot(True)
+        self.wikiSearchTimer.setInterval(WIKI_SEARCH_DELAY)
+        self.wikiSearchTimer.timeout.connect(self.onWikiSearch)
 
         self.areaView.itemSelectionChanged.connect(self.onAreaChange)
-        self.questView.itemSelectionChanged.connect(self.onQuestChange)
+        self.questView.selectionModel().selectionChanged.connect(self.onQuestChange)
         self.questView.customContextMenuRequested.connect(self.onQuestMenu)
-        self.missionView.itemSelectionChanged.connect(self.onMissionChange)
+        self.missionView.selectionModel().selectionChanged.connect(self.onMissionChange)
         self.missionView.customContextMenuRequested.connect(self.onMissionMenu)
-        self.skillView.itemSelectionChanged.connect(self.onSkillChange)
+        self.skillView.selectionModel().selectionChanged.connect(self.onSkillChange)
         self.skillView.customContextMenuRequested.connect(self.onSkillMenu)
-        self.vanquishView.itemSelectionChanged.connect(self.onVanquishChange)
+        self.vanquishView.selectionModel().selectionChanged.connect(self.onVanquishChange)
         self.vanquishView.customContextMenuRequested.connect(self.onVanquishMenu)
-        self.back.triggered.connect(self.wikiView.back)
-        self.fwd.triggered.connect(self.wikiView.forward)
-        self.refresh.triggered.connect(self.wikiView.reload)
-        self.wikiView.urlChanged.connect(self.onUrlChanged)
+        self.questView.activated.connect(self.onItemActivated)
+        self.missionView.activated.connect(self.onItemActivated)
+        self.skillView.activated.connect(self.onItemActivated)
+        self.vanquishView.activated.connect(self.onItemActivated)
+        self.back.triggered.connect(self.onWikiBack)
+        self.fwd.triggered.connect(self.onWikiForward)
+        self.refresh.triggered.connect(self.onWikiRefresh)
+        self.externalWiki.toggled.connect(self.onWikiModeChanged)
         self.location.lineEdit().returnPressed.connect(self.onUrlLoadRequested)
         self.charSelect.activated[int].connect(self.onCharSelected)
+        self.eligibleOnly.toggled.connect(self.updateQuestFilter)
+        self.eligibleOnly.toggled.connect(self.refreshRewardHits)
+        self.compareChars.triggered.connect(self.onCompareChars)
+        self.showTitles.triggered.connect(self.onShowTitles)
+        self.showTimeline.triggered.connect(self.onShowTimeline)
+        self.undoAction.triggered.connect(self.onUndo)
+        self.importAction.triggered.connect(self.onImport)
+        self.exportAction.triggered.connect(self.onExport)
+        self.redoAction.triggered.connect(self.onRedo)
+        self.searchBox.textChanged.connect(self.onSearchChanged)
+        self.wikiSearch.toggled.connect(self.onWikiSearchToggled)
+        self.searchBox.returnPressed.connect(self.onSearchReturn)
+        self.searchResults.itemActivated.connect(self.onSearchActivated)
+
+    def createListView(self, model):
+        view = QtWidgets.QTreeView(self.qlistStack)
+        view.setRootIsDecorated(False)
+        view.setUniformRowHeights(True)
+        proxy = CatalogProxy(view)
+        proxy.setSortRole(SORT_ROLE)
+        proxy.setSourceModel(model)
+        view.setModel(proxy)
+        view.header().setSortIndicator(0, Qt.SortOrder.AscendingOrder)
+        view.setSortingEnabled(True)
+        view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        view.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.qlistStack.addWidget(view)
+        return view
 
     def sizeHint(self):
         return QtCore.QSize(1080, 720)
 
     def closeEvent(self, event):
-        if self.currentChar:
-            self.currentChar.close()
+        self.flushTimer.stop()
+        self.closeChar()
+        self.charPool.close()
+        # Background fetches and indexing get a moment to finish; anything
+        # still running after that is dropped by the closed cache and index
+        self.wikiPrefetch.shutdown(WIKI_SHUTDOWN_WAIT)
+        self.wikiProxy.stop()
+        self.wikiCache.onStore = None
+        if self.wikiIndex is not None:
+            self.wikiIndex.close()
+            self.wikiIndexThread.join(WIKI_SHUTDOWN_WAIT)
+        self.wikiCache.close()
+
+    def closeChar(self):
+        # The character stays open in the pool for switching back to it
+        self.session = None
+        self.statusJournal = None
+        self.currentChar = None
+
+    def flushStatus(self):
+        self.charPool.flush()
 
     def addArea(self, area):
         if isinstance(area, QuestArea):
@@ -309,6 +1138,7 @@ class TrackGui(QtWidgets.QMainWindow):
                 areaGroup = QtWidgets.QTreeWidgetItem(self.areaView)
                 areaGroup.setText(0, area.campaign)
                 areaGroup.setData(0, Qt.ItemDataRole.UserRole, TREE_TYPE_CAMPAIGN)
+            groupKey = (TREE_TYPE_CAMPAIGN, area.campaign)
 
         else:
             if isinstance(area, MissionArea):
@@ -329,16 +1159,106 @@ class TrackGui(QtWidgets.QMainWindow):
                 areaGroup = QtWidgets.QTreeWidgetItem(self.areaView)
                 areaGroup.setText(0, area.treeTitle())
                 areaGroup.setData(0, Qt.ItemDataRole.UserRole, area.treeType())
+            groupKey = (area.treeType(), area.treeTitle())
 
         item = QtWidgets.QTreeWidgetItem(areaGroup)
         item.setText(0, area.name)
         item.setData(0, Qt.ItemDataRole.UserRole, TREE_TYPE_AREA)
+        item.setTextAlignment(1, ITEM_ALIGN_RIGHT)
+        if groupKey not in self.groupNodes:
+            areaGroup.setTextAlignment(1, ITEM_ALIGN_RIGHT)
+            self.groupNodes[groupKey] = (areaGroup, [])
+        self.groupNodes[groupKey][1].append(area)
+        self.areaNodes[area] = (item, groupKey)
+        self.progress.addArea(area)
+        self.ranks.addArea(area)
+        self.searchIndex.addArea(area)
+        if self.wikiIndex is not None:
+            self.wikiIndex.addArea(area)
+
+    def updateProgress(self, areas=None):
+        # Refreshes the completion shown for the given areas (by default,
+        # all of them) and the groups they belong to
+        if areas is None:
+            areas = list(self.areaNodes)
+        groups = set()
+        for area in areas:
+            item, groupKey = self.areaNodes[area]
+            self.setProgressText(item, self.progress.areaProgress(area), area)
+            groups.add(groupKey)
+        for groupKey in groups:
+            groupItem, groupAreas = self.groupNodes[groupKey]
+            progress = []
+            for area in groupAreas:
+                progress += self.progress.areaProgress(area)
+            self.setProgressText(groupItem, progress)
+
+    def setProgressText(self, item, progress, area=None):
+        if self.currentChar is None:
+            item.setText(1, "")
+            item.setToolTip(0, "")
+            item.setToolTip(1, "")
+            return
+
+        lines = []
+        done = total = 0
+        for status, counts in sumProgress(progress).items():
+            done += counts[0]
+            total += counts[1]
+            line = "{}: {} / {} ({:.0f}%)".format(STATUS_TITLES[status], counts[0], counts[1],
+                                                  percent(counts[0], counts[1]))
+            if area is not None:
+                states = self.progress.stateCounts(status, area)
+                if states:
+                    line += " -- " + ", ".join("{} {}".format(count, state)
+                                               for state, count in sorted(states.items()))
+            lines.append(line)
+        item.setText(1, "{:.0f}%".format(percent(done, total)))
+        item.setToolTip(0, "\n".join(lines))
+        item.setToolTip(1, "\n".join(lines))
+
+    def updateRanks(self):
+        if self.rankStatus is None:
+            self.rankView.setTotals(None)
+        else:
+            self.rankView.setTotals(self.ranks.totals(self.rankStatus))
 
     def addChar(self, charName, charType, fileName):
         idx = self.charSelect.count() - 2
         self.charSelect.insertItem(idx, IconProvider.icon(charType), charName, fileName)
         return idx
 
+    def selectArea(self, area):
+        if isinstance(area, QuestArea):
+            groupType, groupName = TREE_TYPE_CAMPAIGN, area.campaign
+        else:
+            groupType, groupName = area.treeType(), area.treeTitle()
+
+        for idx in range(self.areaView.topLevelItemCount()):
+            groupItem = self.areaView.topLevelItem(idx)
+            if groupItem.data(0, Qt.ItemDataRole.UserRole) != groupType \
+                    or groupItem.text(0) != groupName:
+                continue
+            for child in range(groupItem.childCount()):
+                item = groupItem.child(child)
+                if item.text(0) == area.name:
+                    self.areaView.setCurrentItem(item)
+                    self.areaView.scrollToItem(item)
+                    return
+
+    def selectRow(self, row):
+        view = self.qlistStack.currentWidget()
+        model = view.model().sourceModel()
+        index = view.model().mapFromSource(model.index(row, 0))
+        if not index.isValid() and self.eligibleOnly.isChecked():
+            # The row is hidden as ineligible; show every quest rather than
+            # silently selecting nothing
+            self.eligibleOnly.setChecked(False)
+            index = view.model().mapFromSource(model.index(row, 0))
+        view.setCurrentIndex(index)
+        view.scrollTo(index)
+        view.setFocus()
+
     def getCurrentArea(self):
         currentItem = self.areaView.currentItem()
         if not currentItem or currentItem.data(0, Qt.ItemDataRole.UserRole) != TREE_TYPE_AREA:
@@ -363,284 +1283,413 @@ class TrackGui(QtWidgets.QMainWindow):
             return None
 
     def onAreaChange(self):
-        self.questView.clear()
-        self.missionView.clear()
-        self.skillView.clear()
-        self.vanquishView.clear()
         self.currentArea = self.getCurrentArea()
-        if self.currentArea is None:
-            return
+        self.statusMap = {}
+        if self.currentArea is not None:
+            self.loadStatusMap()
 
+        questArea = missionArea = skillArea = vanquishArea = None
         if isinstance(self.currentArea, QuestArea):
             self.qlistStack.setCurrentWidget(self.questView)
-            self.loadQuests()
+            questArea = self.currentArea
         elif isinstance(self.currentArea, MissionArea):
             self.qlistStack.setCurrentWidget(self.missionView)
-            self.loadMissions()
+            missionArea = self.currentArea
         elif isinstance(self.currentArea, SkillArea):
             self.qlistStack.setCurrentWidget(self.skillView)
-            self.loadSkills()
+            skillArea = self.currentArea
         elif isinstance(self.currentArea, VanquishArea):
             self.qlistStack.setCurrentWidget(self.vanquishView)
-            self.loadVanquishAreas()
-
-    def formatNum(self, value, hm_value = None):
-        text = '---'
-        if value:
-            text = locale.format_string("%d", value, grouping=True)
-        if hm_value:
-            text += ' ({})'.format(self.formatNum(hm_value))
-        return text
-
-    def loadQuests(self):
-        # Load the quests in the area
-        self.questView.setSortingEnabled(False)
-        for idx in range(len(self.currentArea.quests)):
-            quest = self.currentArea.quests[idx]
-
-            item = QtWidgets.QTreeWidgetItem(self.questView)
-            item.setData(0, Qt.ItemDataRole.UserRole, idx)
-            item.setText(0, quest.name)
-            item.setText(1, quest.quest_type)
-            if quest.quest_type == 'Primary':
-                item.setIcon(1, IconProvider.icon('q_pri'))
-            if quest.repeat:
-                item.setIcon(2, IconProvider.icon('q_rep'))
-                item.setStatusTip(2, "Repeatable")
-            if quest.profession is not None:
-                prof = quest.profession
-                if quest.profession_lock == PROFESSION_PRIMARY:
-                    prof += " (P)"
-                elif quest.profession_lock == PROFESSION_UNLOCKED:
-                    prof = "({})".format(quest.profession)
-                item.setText(3, prof)
-                item.setIcon(3, IconProvider.icon(quest.profession))
-            if quest.char_type is not None:
-                item.setText(4, quest.char_type)
-                item.setIcon(4, IconProvider.icon(quest.char_type))
-            item.setText(5, self.formatNum(quest.xp))
-            item.setText(6, quest.rewardString())
-            item.setStatusTip(6, quest.rewardTip())
-            item.setFont(6, self.fixed_font)
-
-            item.setTextAlignment(5, Qt.AlignmentFlag.AlignRight)
-            item.setTextAlignment(7, Qt.AlignmentFlag.AlignHCenter)
-
-            self.updateQuestStatus(item)
-
-        self.questView.setSortingEnabled(True)
-
-    def loadMissions(self):
-        # Load the missions in the campaign
-        self.missionView.setSortingEnabled(False)
-        for idx in range(len(self.currentArea.missions)):
-            mission = self.currentArea.missions[idx]
-
-            item = QtWidgets.QTreeWidgetItem(self.missionView)
-            item.setData(0, Qt.ItemDataRole.UserRole, idx)
-            item.setText(0, mission.name)
-            item.setText(1, mission.rank_type)
-            item.setIcon(1, IconProvider.icon(mission.rank_type))
-            item.setText(2, self.formatNum(mission.rank, mission.hm_rank))
-            item.setText(3, self.formatNum(mission.z_xp))
-            item.setText(4, self.formatNum(mission.z_rank))
-            item.setText(5, self.formatNum(mission.z_coins))
-
-            item.setTextAlignment(2, Qt.AlignmentFlag.AlignRight)
-            item.setTextAlignment(3, Qt.AlignmentFlag.AlignRight)
-            item.setTextAlignment(4, Qt.AlignmentFlag.AlignRight)
-            item.setTextAlignment(5, Qt.AlignmentFlag.AlignRight)
-            item.setTextAlignment(6, Qt.AlignmentFlag.AlignHCenter)
-            item.setTextAlignment(7, Qt.AlignmentFlag.AlignHCenter)
-
-            self.updateMissionStatus(item)
-
-        self.missionView.setSortingEnabled(True)
-
-    def loadSkills(self):
-        # Load the skills in the campaign
-        self.skillView.setSortingEnabled(False)
-        for idx in range(len(self.currentArea.skills)):
-            skill = self.currentArea.skills[idx]
-
-            item = QtWidgets.QTreeWidgetItem(self.skillView)
-            item.setData(0, Qt.ItemDataRole.UserRole, idx)
-            item.setText(0, skill.name)
-            if skill.profession is not None:
-                item.setText(1, skill.profession)
-                item.setIcon(1, IconProvider.icon(skill.profession))
-            else:
-                item.setText(1, '---')
-            if skill.attribute is not None:
-                item.setText(2, skill.attribute)
-            else:
-                item.setText(2, '---')
-
-            item.setTextAlignment(3, Qt.AlignmentFlag.AlignHCenter)
-
-            self.updateSkillStatus(item)
-
-        self.skillView.setSortingEnabled(True)
-
-    def loadVanquishAreas(self):
-        # Load the Explorable Areas in the campaign
-        self.vanquishView.setSortingEnabled(False)
-        for idx in range(len(self.currentArea.areas)):
-            vq_area = self.currentArea.areas[idx]
-
-            item = QtWidgets.QTreeWidgetItem(self.vanquishView)
-            item.setData(0, Qt.ItemDataRole.UserRole, idx)
-            item.setText(0, vq_area.name)
-            item.setText(1, '{} - {}'.format(vq_area.min_foes, vq_area.max_foes))
-            item.setText(2, vq_area.rank_type)
-            item.setIcon(2, IconProvider.icon(vq_area.rank_type))
-            item.setText(3, self.formatNum(vq_area.z_xp))
-            item.setText(4, self.formatNum(vq_area.z_rank))
-            item.setText(5, vq_area.z_rank_type)
-            item.setIcon(5, IconProvider.icon(vq_area.z_rank_type))
-            item.setText(6, self.formatNum(vq_area.z_coins))
-
-            item.setTextAlignment(1, Qt.AlignmentFlag.AlignRight)
-            item.setTextAlignment(3, Qt.AlignmentFlag.AlignRight)
-            item.setTextAlignment(4, Qt.AlignmentFlag.AlignRight)
-            item.setTextAlignment(6, Qt.AlignmentFlag.AlignRight)
-            item.setTextAlignment(7, Qt.AlignmentFlag.AlignHCenter)
-
-            self.updateVanquishStatus(item)
-
-        self.vanquishView.setSortingEnabled(True)
-
-    def updateQuestStatus(self, item):
-        if self.currentChar is None or self.currentArea is None:
-            return
-
-        csr = self.currentChar.cursor()
-        csr.execute("SELECT state FROM status WHERE quest_name=?",
-                    ("{}::{}".format(self.currentArea.name, item.text(0)),))
-        row = csr.fetchone()
-        if row:
-            item.setText(7, row[0])
-            if row[0] == 'Done':
-                item.setBackground(7, QtGui.QColor(0xC0, 0xE0, 0xC0))
-            elif row[0] == 'Complete':
-                item.setBackground(7, QtGui.QColor(0xC0, 0xE0, 0xFF))
-            elif row[0] == 'Active':
-                item.setBackground(7, QtGui.QColor(0xFF, 0xE0, 0xC0))
-            elif row[0] == 'N/A':
-                item.setBackground(7, QtGui.QColor(0xE0, 0xE0, 0xE0))
-            else:
-                item.setBackground(7, item.background(0))
-
-    def updateMissionStatus(self, item):
-        if self.currentChar is None or self.currentArea is None:
-            return
-
-        csr = self.currentChar.cursor()
-        csr.execute("SELECT state FROM status WHERE quest_name=?",
-                    ("Mission!{}::{}".format(self.currentArea.name, item.text(0)),))
-        row = csr.fetchone()
-        if row:
-            item.setText(6, row[0])
-            if row[0] == 'Master':
-                item.setBackground(6, QtGui.QColor(0xC0, 0xE0, 0xC0))
-            elif row[0] == 'Expert':
-                item.setBackground(6, QtGui.QColor(0xFF, 0xE0, 0xC0))
-            elif row[0] == 'Standard':
-                item.setBackground(6, QtGui.QColor(0xFF, 0xFF, 0xC0))
-            else:
-                item.setBackground(6, item.background(0))
-
-        csr = self.currentChar.cursor()
-        csr.execute("SELECT state FROM status WHERE quest_name=?",
-                    ("Mission_HM!{}::{}".format(self.currentArea.name, item.text(0)),))
-        row = csr.fetchone()
-        if row:
-            item.setText(7, row[0])
-            if row[0] == 'Master':
-                item.setBackground(7, QtGui.QColor(0xC0, 0xE0, 0xC0))
-            elif row[0] == 'Expert':
-                item.setBackground(7, QtGui.QColor(0xFF, 0xE0, 0xC0))
-            elif row[0] == 'Standard':
-                item.setBackground(7, QtGui.QColor(0xFF, 0xFF, 0xC0))
-            else:
-                item.setBackground(7, item.background(0))
-
-    def updateSkillStatus(self, item):
-        if self.currentChar is None or self.currentArea is None:
-            return
-
-        csr = self.currentChar.cursor()
-        csr.execute("SELECT state FROM status WHERE quest_name=?",
-                    ("Skill!{}::{}".format(self.currentArea.name, item.text(0)),))
-        row = csr.fetchone()
-        if row:
-            item.setText(3, row[0])
-            if row[0] == 'Known':
-                item.setBackground(3, QtGui.QColor(0xC0, 0xE0, 0xC0))
-            elif row[0] == 'Unlocked':
-                item.setBackground(3, QtGui.QColor(0xC0, 0xE0, 0xFF))
-            else:
-                item.setBackground(3, item.background(0))
+            vanquishArea = self.currentArea
+
+        self.questModel.setArea(questArea, self.statusMap)
+        self.missionModel.setArea(missionArea, self.statusMap)
+        self.skillModel.setArea(skillArea, self.statusMap)
+        self.vanquishModel.setArea(vanquishArea, self.statusMap)
+        self.updateQuestFilter()
+        self.prefetchWiki()
+        self.compareChars.setEnabled(self.currentArea is not None)
+
+    def prefetchWiki(self):
+        if self.currentArea is None or self.externalWiki.isChecked():
+            self.wikiPrefetch.cancel()
+            self.prefetchArea = None
+            return
+        if self.currentArea is self.prefetchArea:
+            # e.g. only the character changed
+            return
+        self.prefetchArea = self.currentArea
+        wikiPath = WIKI_URL[len(WIKI_HOST):]
+        self.wikiPrefetch.prefetch([wikiPath + info.wiki for info in areaItems(self.currentArea)])
+
+    def onCompareChars(self):
+        if self.currentArea is None:
+            return
 
-    def updateVanquishStatus(self, item):
-        if self.currentChar is None or self.currentArea is None:
+        charNames = []
+        fileNames = []
+        for idx in range(self.charSelect.count()):
+            fileName = self.charSelect.itemData(idx)
+            if fileName:
+                charNames.append(self.charSelect.itemText(idx))
+                fileNames.append(os.path.join(DATA_BASE, str(fileName)))
+        if not fileNames:
             return
 
-        csr = self.currentChar.cursor()
-        csr.execute("SELECT state FROM status WHERE quest_name=?",
-                    ("Vanquish!{}::{}".format(self.currentArea.name, item.text(0)),))
-        row = csr.fetchone()
-        if row:
-            item.setText(7, row[0])
-            if row[0] == 'Done':
-                item.setBackground(7, QtGui.QColor(0xC0, 0xE0, 0xC0))
-            else:
-                item.setBackground(7, item.background(0))
+        # The comparison reads the databases directly
+        self.flushStatus()
+        try:
+            results = compareStatus(fileNames, areaStatuses(self.currentArea), self.currentArea.name)
+        except (sqlite3.Error, RuntimeError) as err:
+            QtWidgets.QMessageBox.warning(self, "Error", "Error: {}".format(err))
+            return
+        CompareDialog(self, self.currentArea, charNames, results).exec()
+
+    def onShowTitles(self):
+        fileNames = []
+        for idx in range(self.charSelect.count()):
+            fileName = self.charSelect.itemData(idx)
+            if fileName:
+                fileNames.append(os.path.join(DATA_BASE, str(fileName)))
+
+        # Only characters whose databases changed since the last time are
+        # read again
+        self.flushStatus()
+        try:
+            chars = self.titleScanner.scan(fileNames)
+        except (sqlite3.Error, RuntimeError) as err:
+            QtWidgets.QMessageBox.warning(self, "Error", "Error: {}".format(err))
+            return
+        areas = list(self.skillAreas.values()) + list(self.vanquishAreas.values()) \
+                + list(self.missionAreas.values())
+        TitleDialog(self, accountTitles(areas, chars)).exec()
+
+    def onShowTimeline(self):
+        if self.currentChar is None:
+            return
+        # The counts are kept in the database as changes are committed
+        self.flushStatus()
+        areas = list(self.areaNodes)
+        TimelineDialog(self, self.currentChar, areas).exec()
+
+    def onExport(self):
+        if self.currentChar is None:
+            return
+        fileName, selected = QtWidgets.QFileDialog.getSaveFileName(
+                self, "Export Progress", self.session.name + '.csv', TRANSFER_FILTER)
+        if not fileName:
+            return
+
+        self.flushStatus()
+        try:
+            with open(fileName, 'w', encoding='utf-8', newline='') as outFile:
+                exportStatus(self.currentChar, outFile, transferFormat(fileName))
+        except (OSError, TransferError, sqlite3.Error) as err:
+            QtWidgets.QMessageBox.warning(self, "Error", "Error: {}".format(err))
+
+    def onImport(self):
+        if self.currentChar is None:
+            return
+        fileName, selected = QtWidgets.QFileDialog.getOpenFileName(
+                self, "Import Progress", "", TRANSFER_FILTER)
+        if not fileName:
+            return
+
+        self.flushTimer.stop()
+        self.flushStatus()
+        try:
+            with open(fileName, 'r', encoding='utf-8', newline='') as inFile:
+                result = importStatus(self.currentChar, inFile, transferFormat(fileName),
+                                      list(self.areaNodes))
+        except (OSError, TransferError, sqlite3.Error) as err:
+            QtWidgets.QMessageBox.warning(self, "Error", "Error: {}".format(err))
+            return
+
+        # The import bypasses the journal, so the session's cached state is
+        # reloaded from the database
+        self.session.invalidate()
+        self.onCharSelected(self.currentCharIdx)
+
+        message = "Imported {} statuses.".format(result.imported)
+        if result.skipped:
+            message += "\n\nSkipped {}:\n".format(result.skipped)
+            message += "\n".join("{}: {}".format(recordNum, problem)
+                                  for recordNum, problem in result.problems[:TRANSFER_SHOWN])
+            if result.skipped > TRANSFER_SHOWN:
+                message += "\n..."
+        QtWidgets.QMessageBox.information(self, "Import Progress", message)
+
+    def updateQuestFilter(self):
+        rowMask = None
+        if self.eligibleOnly.isChecked() and self.currentChar is not None \
+                and isinstance(self.currentArea, QuestArea):
+            rowMask = self.currentArea.eligibleMask(self.charType, self.profession,
+                                                    self.profession2)
+        self.questView.model().setRowMask(rowMask)
+
+    def loadStatusMap(self):
+        if self.currentChar is None:
+            return
+
+        if isinstance(self.currentArea, QuestArea):
+            kinds = (STATUS_QUEST,)
+        elif isinstance(self.currentArea, MissionArea):
+            kinds = (STATUS_MISSION, STATUS_MISSION_HM)
+        elif isinstance(self.currentArea, SkillArea):
+            kinds = (STATUS_SKILL,)
+        elif isinstance(self.currentArea, VanquishArea):
+            kinds = (STATUS_VANQUISH,)
+        self.statusMap = self.session.areaStatus(kinds, self.currentArea.name)
 
     def updateProfession2(self, prof):
         if self.currentChar is None:
             return
 
-        csr = self.currentChar.cursor()
-        csr.execute("UPDATE config SET value=? WHERE key='Profession2'", (prof,))
-        self.currentChar.commit()
+        self.session.setConfig('Profession2', prof)
+        self.session.profession2 = prof
 
         self.prof2Select.setText(prof)
         self.prof2Select.setIcon(IconProvider.icon(prof))
+        self.profession2 = prof
+        self.updateQuestFilter()
+        self.refreshRewardHits()
 
     def onQuestChange(self):
-        if not self.questView.currentItem() or not self.currentArea:
+        index = self.questView.currentIndex()
+        if not index.isValid() or not self.currentArea:
             return
 
-        idx = int(self.questView.currentItem().data(0, Qt.ItemDataRole.UserRole))
-        url = QtCore.QUrl.fromEncoded(bytes(WIKI_URL + self.currentArea.quests[idx].wiki, 'utf-8'))
-        self.wikiView.load(url)
+        idx = self.questView.model().mapToSource(index).row()
+        self.loadWiki(wikiUrl(self.currentArea.quests[idx].wiki))
 
     def onMissionChange(self):
-        if not self.missionView.currentItem() or not self.currentArea:
+        index = self.missionView.currentIndex()
+        if not index.isValid() or not self.currentArea:
             return
 
-        idx = int(self.missionView.currentItem().data(0, Qt.ItemDataRole.UserRole))
-        url = QtCore.QUrl.fromEncoded(bytes(WIKI_URL + self.currentArea.missions[idx].wiki, 'utf-8'))
-        self.wikiView.load(url)
+        idx = self.missionView.model().mapToSource(index).row()
+        self.loadWiki(wikiUrl(self.currentArea.missions[idx].wiki))
 
     def onSkillChange(self):
-        if not self.skillView.currentItem() or not self.currentArea:
+        index = self.skillView.currentIndex()
+        if not index.isValid() or not self.currentArea:
             return
 
-        idx = int(self.skillView.currentItem().data(0, Qt.ItemDataRole.UserRole))
-        url = QtCore.QUrl.fromEncoded(bytes(WIKI_URL + self.currentArea.skills[idx].wiki, 'utf-8'))
-        self.wikiView.load(url)
+        idx = self.skillView.model().mapToSource(index).row()
+        self.loadWiki(wikiUrl(self.currentArea.skills[idx].wiki))
 
     def onVanquishChange(self):
-        if not self.vanquishView.currentItem() or not self.currentArea:
+        index = self.vanquishView.currentIndex()
+        if not index.isValid() or not self.currentArea:
             return
 
-        idx = int(self.vanquishView.currentItem().data(0, Qt.ItemDataRole.UserRole))
-        url = QtCore.QUrl.fromEncoded(bytes(WIKI_URL + self.currentArea.areas[idx].wiki, 'utf-8'))
-        self.wikiView.load(url)
+        idx = self.vanquishView.model().mapToSource(index).row()
+        self.loadWiki(wikiUrl(self.currentArea.areas[idx].wiki))
+
+    def createWikiView(self):
+        if self.wikiView is None:
+            QtWebEngineWidgets = loadWebEngine()
+            self.wikiView = QtWebEngineWidgets.QWebEngineView(self.wikiStack)
+            self.wikiView.urlChanged.connect(self.onUrlChanged)
+            self.wikiStack.addWidget(self.wikiView)
+        self.wikiStack.setCurrentWidget(self.wikiView)
+        return self.wikiView
+
+    def loadWiki(self, url):
+        # Selections made with the mouse load right away; keyboard
+        # navigation is debounced
+        immediate = QtGui.QGuiApplication.mouseButtons() != Qt.MouseButton.NoButton
+        self.wikiNavigator.navigate(url, immediate)
+
+    def stopWiki(self):
+        if self.wikiView is not None:
+            self.wikiView.stop()
+
+    def showWiki(self, url):
+        if self.externalWiki.isChecked():
+            # Only track the page; it is opened when the row is activated so
+            # browsing the list doesn't spawn a browser tab per row.
+            self.onUrlChanged(url)
+        else:
+            self.createWikiView().load(self.proxyUrl(url))
+
+    def proxyUrl(self, url):
+        text = url.toString(QtCore.QUrl.ComponentFormattingOption.FullyEncoded)
+        if text.startswith(WIKI_HOST + '/'):
+            return QtCore.QUrl.fromEncoded(bytes(self.wikiProxy.baseUrl() + text[len(WIKI_HOST):], 'utf-8'))
+        return url
+
+    def wikiDisplayUrl(self, url):
+        text = url.toString(QtCore.QUrl.ComponentFormattingOption.FullyEncoded)
+        base = self.wikiProxy.baseUrl()
+        if text.startswith(base + '/'):
+            return QtCore.QUrl.fromEncoded(bytes(WIKI_HOST + text[len(base):], 'utf-8'))
+        return url
+
+    def updateWikiMode(self):
+        external = self.externalWiki.isChecked()
+        self.back.setEnabled(not external)
+        self.fwd.setEnabled(not external)
+        if external:
+            self.refresh.setText("Open in Browser")
+            self.wikiPlaceholder.setText("Wiki pages open in your web browser.\n"
+                                         "Double-click an item or press Enter to view its page.")
+            self.wikiStack.setCurrentWidget(self.wikiPlaceholder)
+        else:
+            self.refresh.setText("Refresh")
+            self.wikiPlaceholder.setText("Select an item to view its wiki page.")
+            if self.wikiView is not None:
+                self.wikiStack.setCurrentWidget(self.wikiView)
+
+    def onWikiModeChanged(self, external):
+        self.settings.setValue('ExternalWiki', 'true' if external else 'false')
+        self.updateWikiMode()
+        self.prefetchWiki()
+
+    def openExternal(self, url):
+        if url.isValid() and not url.isEmpty():
+            QtGui.QDesktopServices.openUrl(url)
+
+    def onItemActivated(self, index):
+        # Make sure the location is up to date with the activated row
+        self.wikiNavigator.loadPending()
+        if self.externalWiki.isChecked():
+            self.openExternal(QtCore.QUrl(self.location.currentText()))
+
+    def onWikiBack(self):
+        self.wikiNavigator.cancel()
+        if self.wikiView is not None:
+            self.wikiView.back()
+
+    def onWikiForward(self):
+        self.wikiNavigator.cancel()
+        if self.wikiView is not None:
+            self.wikiView.forward()
+
+    def onWikiRefresh(self):
+        if self.externalWiki.isChecked():
+            self.openExternal(QtCore.QUrl(self.location.currentText()))
+        elif self.wikiView is not None:
+            self.wikiView.reload()
+
+    def onSearchChanged(self, text):
+        self.searchTimer.stop()
+        self.wikiSearchTimer.stop()
+        if not text.strip():
+            self.areaStack.setCurrentWidget(self.areaView)
+            return
+        if self.wikiSearch.isChecked():
+            # Full text queries are too slow to run on every keystroke
+            self.wikiSearchTimer.start()
+        else:
+            self.onSearchMore()
+
+    def onWikiSearch(self):
+        self.wikiSearchTimer.stop()
+        if self.searchBox.text().strip():
+            self.showWikiHits(self.wikiIndex.search(self.searchBox.text()))
+
+    def onSearchMore(self):
+        # Searching again for the same text continues an unfinished search
+        self.showSearchHits(self.searchIndex.search(self.searchBox.text()))
+        if not self.searchIndex.isComplete():
+            self.searchTimer.start()
+
+    def onWikiSearchToggled(self, checked):
+        if checked:
+            self.searchBox.setPlaceholderText("Search wiki page text...")
+        else:
+            self.searchBox.setPlaceholderText("Search quests, missions, skills...")
+        self.onSearchChanged(self.searchBox.text())
+
+    def onRewardFilterChanged(self):
+        self.searchTimer.stop()
+        self.wikiSearchTimer.stop()
+        reward = 0
+        for reward_type, action in enumerate(self.rewardActions):
+            if action.isChecked():
+                reward |= rewards.rewardFlag(reward_type)
+        if not reward:
+            self.rewardSelect.setText("Rewards")
+            self.areaStack.setCurrentWidget(self.areaView)
+            return
+        self.rewardSelect.setText("Rewards: {}".format(rewards.rewardToSummary(reward).replace(' ', '')))
+
+        finished = {}
+        character = None
+        if self.currentChar is not None:
+            self.flushStatus()
+            finished = loadFinishedItems(self.currentChar, STATUS_QUEST, ("Done", "N/A"))
+            if self.eligibleOnly.isChecked():
+                character = (self.charType, self.profession, self.profession2)
+        self.showSearchHits(findRewardQuests(self.questAreas.values(), reward, finished, character))
+
+    def refreshRewardHits(self):
+        # Reward results follow the current character and its progress,
+        # unless a text search has replaced them
+        if self.searchBox.text() or self.areaStack.currentWidget() is not self.searchResults \
+                or not any(action.isChecked() for action in self.rewardActions):
+            return
+        row = self.searchResults.currentRow()
+        self.onRewardFilterChanged()
+        if row >= 0 and self.searchResults.count():
+            self.searchResults.setCurrentRow(min(row, self.searchResults.count() - 1))
+
+    def showSearchHits(self, hits):
+        self.searchHits = hits
+        self.searchResults.clear()
+        for idx, hit in enumerate(self.searchHits):
+            if hit.row is None:
+                label = areaLabel(hit.area)
+            else:
+                label = "{}  ({})".format(hit.name(), areaLabel(hit.area))
+            item = QtWidgets.QListWidgetItem(label, self.searchResults)
+            item.setData(Qt.ItemDataRole.UserRole, idx)
+        self.areaStack.setCurrentWidget(self.searchResults)
+
+    def showWikiHits(self, wikiHits):
+        # Pages for catalog entries are listed as those entries; others are
+        # listed by page title and just open the page.
+        self.searchHits = []
+        self.searchResults.clear()
+        for wikiHit in wikiHits:
+            for hit in (wikiHit.items or [wikiHit]):
+                if isinstance(hit, WikiHit):
+                    label = "{}  (wiki)".format(wikiHit.title)
+                else:
+                    label = "{}  ({})".format(hit.name(), areaLabel(hit.area))
+                item = QtWidgets.QListWidgetItem(label, self.searchResults)
+                item.setData(Qt.ItemDataRole.UserRole, len(self.searchHits))
+                item.setToolTip(wikiHit.snippet)
+                item.setStatusTip(wikiHit.snippet)
+                self.searchHits.append(hit)
+        self.areaStack.setCurrentWidget(self.searchResults)
+
+    def onSearchReturn(self):
+        if self.wikiSearchTimer.isActive():
+            self.onWikiSearch()
+        if self.searchResults.count() > 0:
+            self.onSearchActivated(self.searchResults.item(0))
+
+    def onSearchActivated(self, item):
+        hit = self.searchHits[int(item.data(Qt.ItemDataRole.UserRole))]
+        if isinstance(hit, WikiHit):
+            url = QtCore.QUrl.fromEncoded(bytes(slugUrl(hit.slug), 'utf-8'))
+            if self.externalWiki.isChecked():
+                self.openExternal(url)
+            else:
+                self.wikiNavigator.navigate(url, True)
+            return
+
+        # Reward results stay up so they can be worked through one by one
+        if self.searchBox.text():
+            self.searchBox.clear()
+        self.selectArea(hit.area)
+        if hit.row is not None:
+            self.selectRow(hit.row)
 
     def onUrlChanged(self, url):
+        url = self.wikiDisplayUrl(url)
         self.location.insertItem(0, url.toString())
         self.location.setCurrentIndex(0)
 
@@ -655,19 +1704,25 @@ class TrackGui(QtWidgets.QMainWindow):
     def onUrlLoadRequested(self):
         url = QtCore.QUrl()
         url.setUrl(self.location.currentText())
-        self.wikiView.load(url)
+        self.wikiNavigator.cancel()
+        if self.externalWiki.isChecked():
+            self.openExternal(url)
+        else:
+            self.createWikiView().load(self.proxyUrl(url))
 
     def onCharSelected(self, idx):
         if idx < 0:
-            if self.currentChar:
-                self.currentChar.close()
-                self.currentChar = None
+            self.closeChar()
 
             self.profSelect.setText("")
             self.profSelect.setIcon(QtGui.QIcon())
             self.prof2Select.setText("")
             self.prof2Select.setIcon(QtGui.QIcon())
 
+            self.progress.load(None)
+            self.updateProgress()
+            self.rankStatus = None
+            self.updateRanks()
             self.onAreaChange()
 
         elif not self.charSelect.itemData(idx):
@@ -677,17 +1732,9 @@ class TrackGui(QtWidgets.QMainWindow):
                 fname = dialog.savedName()[0].lower().replace(' ', '_') + '.db'
 
                 # Initialize the database
-                db = sqlite3.connect(os.path.join(DATA_BASE, fname))
-                csr = db.cursor()
-                csr.execute("CREATE TABLE config (key TEXT, value TEXT)")
-                csr.execute("CREATE TABLE status (quest_name TEXT UNIQUE, state TEXT)")
-                csr.execute("INSERT INTO config (key, value) VALUES ('Version', '1')")
-                csr.execute("INSERT INTO config (key, value) VALUES ('Name', ?)", dialog.savedName())
-                csr.execute("INSERT INTO config (key, value) VALUES ('Type', ?)", dialog.savedType())
-                csr.execute("INSERT INTO config (key, value) VALUES ('Profession1', ?)", dialog.savedProfession())
-                csr.execute("INSERT INTO config (key, value) VALUES ('Profession2', ?)", dialog.savedProfession2())
-                db.commit()
-                db.close()
+                createCharDb(os.path.join(DATA_BASE, fname), dialog.savedName()[0],
+                             dialog.savedType()[0], dialog.savedProfession()[0],
+                             dialog.savedProfession2()[0])
 
                 idx = self.addChar(dialog.savedName()[0], dialog.savedType()[0], fname)
                 self.charSelect.setCurrentIndex(idx)
@@ -697,41 +1744,120 @@ class TrackGui(QtWidgets.QMainWindow):
 
         else:
             # Selected an actual character
-            if self.currentChar:
-                self.currentChar.close()
-            self.currentChar = sqlite3.connect(os.path.join(DATA_BASE, str(self.charSelect.itemData(idx))))
-
-            csr = self.currentChar.cursor()
-            csr.execute("SELECT value FROM config WHERE key='Version'")
-            dbver = int(csr.fetchone()[0])
-            if dbver > 1:
-                QtWidgets.QMessageBox.critical(self, "Error", "Error: Character version too new")
+            self.closeChar()
+            charFile = os.path.join(DATA_BASE, str(self.charSelect.itemData(idx)))
+            try:
+                self.session = self.charPool.open(charFile)
+            except RuntimeError as err:
+                QtWidgets.QMessageBox.critical(self, "Error", "Error: {}".format(err))
                 sys.exit(1)
+            self.currentChar = self.session.db
+            self.statusJournal = self.session.journal
 
-            csr.execute("SELECT value FROM config WHERE key='Profession1'")
-            prof = csr.fetchone()[0]
+            self.charType = self.session.charType
+            prof = self.session.profession
             self.profSelect.setText(prof)
             self.profSelect.setIcon(IconProvider.icon(prof))
-            csr.execute("SELECT value FROM config WHERE key='Profession2'")
-            prof = csr.fetchone()[0]
+            self.profession = prof
+            prof = self.session.profession2
             self.prof2Select.setText(prof)
             self.prof2Select.setIcon(IconProvider.icon(prof))
+            self.profession2 = prof
 
+            # Progress counts are kept per character, and stay current
+            # through ProgressTracker.update()
+            if self.session.progress is None:
+                self.progress.load(self.currentChar)
+                self.session.progress = self.progress.counts
+            else:
+                self.progress.counts = self.session.progress
+            if self.session.ranks is None:
+                self.session.ranks = self.ranks.load(self.currentChar)
+            self.rankStatus = self.session.ranks
+            self.updateProgress()
+            self.updateRanks()
             self.onAreaChange()
+        self.showTimeline.setEnabled(self.currentChar is not None)
+        self.transfer.setEnabled(self.currentChar is not None)
+        self.updateUndoActions()
         self.currentCharIdx = idx
+        self.refreshRewardHits()
+
+    def saveQuestStates(self, changes):
+        # Changes always come from the current area, whose status map has
+        # the previous states
+        for key, state in changes:
+            self.progress.update(key, self.statusMap.get(key, ""), state)
+            self.ranks.update(self.rankStatus, key, state)
+        self.session.undoStack.record([(key, self.statusMap.get(key), state)
+                                       for key, state in changes])
+        self.statusJournal.setList(changes)
+        self.statusMap.update(changes)
+        self.updateProgress([self.currentArea])
+        self.updateRanks()
+        self.updateUndoActions()
+        if len(changes) > 1:
+            # Bulk edits are committed right away as a single transaction
+            self.flushStatus()
+        else:
+            self.flushTimer.start()
+        self.refreshRewardHits()
 
-    def saveQuestState(self, questName, state):
-        csr = self.currentChar.cursor()
-        csr.execute("REPLACE INTO status (quest_name, state) VALUES (?, ?)",
-                    (questName, state))
-        self.currentChar.commit()
+    def updateUndoActions(self):
+        self.undoAction.setEnabled(self.session is not None and self.session.undoStack.canUndo())
+        self.redoAction.setEnabled(self.session is not None and self.session.undoStack.canRedo())
 
-    def onQuestMenu(self, pos):
-        item = self.questView.itemAt(pos)
-        if item is None or self.currentChar is None or self.currentArea is None:
+    def onUndo(self):
+        if self.session is not None and self.session.undoStack.canUndo():
+            self.replayChanges(self.session.undo)
+
+    def onRedo(self):
+        if self.session is not None and self.session.undoStack.canRedo():
+            self.replayChanges(self.session.redo)
+
+    def replayChanges(self, replay):
+        # Pending edits are written first, then the step as one transaction
+        self.flushTimer.stop()
+        try:
+            changes = replay()
+        except sqlite3.Error as err:
+            QtWidgets.QMessageBox.warning(self, "Error", "Error: {}".format(err))
+            self.updateUndoActions()
             return
 
-        questName = "{}::{}".format(self.currentArea.name, item.text(0))
+        touched = set()
+        for key, old, new in changes:
+            self.progress.update(key, old or "", new or "")
+            self.ranks.update(self.rankStatus, key, new or "")
+            touched.add(((key[0], key[3]), key[1]))
+        self.updateProgress([area for area in self.areaNodes
+                             if any((status, area.name) in touched for status in areaStatuses(area))])
+        self.updateRanks()
+        self.updateUndoActions()
+
+        # The current area's status map was updated in place by the session
+        for model in (self.questModel, self.missionModel, self.skillModel, self.vanquishModel):
+            if model.area is not None and model.area is self.currentArea:
+                model.setArea(self.currentArea, self.statusMap)
+        self.refreshRewardHits()
+
+    def menuRows(self, view, pos):
+        index = view.indexAt(pos)
+        if not index.isValid():
+            return []
+
+        # Apply to the whole selection if the menu was opened on a selected
+        # row; otherwise just to the row under the cursor.
+        if view.selectionModel().isSelected(index):
+            indexes = view.selectionModel().selectedRows()
+        else:
+            indexes = [index]
+        return [view.model().mapToSource(index).row() for index in indexes]
+
+    def onQuestMenu(self, pos):
+        rows = self.menuRows(self.questView, pos)
+        if not rows or self.currentChar is None or self.currentArea is None:
+            return
 
         menu = QtWidgets.QMenu()
         noState = menu.addAction("(Clear)")
@@ -742,26 +1868,28 @@ class TrackGui(QtWidgets.QMainWindow):
         action = menu.exec(self.questView.viewport().mapToGlobal(pos))
 
         if action == noState:
-            self.saveQuestState(questName, "")
+            state = ""
         elif action == activeState:
-            self.saveQuestState(questName, "Active")
+            state = "Active"
         elif action == completeState:
-            self.saveQuestState(questName, "Complete")
+            state = "Complete"
         elif action == doneState:
-            self.saveQuestState(questName, "Done")
+            state = "Done"
         elif action == naState:
-            self.saveQuestState(questName, "N/A")
+            state = "N/A"
+        else:
+            return
 
-        self.updateQuestStatus(item)
+        area = self.currentArea
+        self.saveQuestStates([(statusKey(STATUS_QUEST, area.name, area.quests[row].name), state)
+                              for row in rows])
+        self.questModel.rowsChanged(rows)
 
     def onMissionMenu(self, pos):
-        item = self.missionView.itemAt(pos)
-        if item is None or self.currentChar is None or self.currentArea is None:
+        rows = self.menuRows(self.missionView, pos)
+        if not rows or self.currentChar is None or self.currentArea is None:
             return
 
-        missionName = "Mission!{}::{}".format(self.currentArea.name, item.text(0))
-        missionHMName = "Mission_HM!{}::{}".format(self.currentArea.name, item.text(0))
-
         menu = QtWidgets.QMenu()
         header = menu.addAction("Normal Mode")
         header.setEnabled(False)
@@ -776,144 +1904,107 @@ class TrackGui(QtWidgets.QMainWindow):
         hmStandardState = menu.addAction("Standard")
         hmExpertState = menu.addAction("Expert")
         hmMasterState = menu.addAction("Master")
-        action = menu.exec(self.questView.viewport().mapToGlobal(pos))
+        action = menu.exec(self.missionView.viewport().mapToGlobal(pos))
 
         if action == nmClearState:
-            self.saveQuestState(missionName, "")
+            status, state = STATUS_MISSION, ""
         elif action == nmStandardState:
-            self.saveQuestState(missionName, "Standard")
+            status, state = STATUS_MISSION, "Standard"
         elif action == nmExpertState:
-            self.saveQuestState(missionName, "Expert")
+            status, state = STATUS_MISSION, "Expert"
         elif action == nmMasterState:
-            self.saveQuestState(missionName, "Master")
+            status, state = STATUS_MISSION, "Master"
         elif action == hmClearState:
-            self.saveQuestState(missionHMName, "")
+            status, state = STATUS_MISSION_HM, ""
         elif action == hmStandardState:
-            self.saveQuestState(missionHMName, "Standard")
+            status, state = STATUS_MISSION_HM, "Standard"
         elif action == hmExpertState:
-            self.saveQuestState(missionHMName, "Expert")
+            status, state = STATUS_MISSION_HM, "Expert"
         elif action == hmMasterState:
-            self.saveQuestState(missionHMName, "Master")
+            status, state = STATUS_MISSION_HM, "Master"
+        else:
+            return
 
-        self.updateMissionStatus(item)
+        area = self.currentArea
+        self.saveQuestStates([(statusKey(status, area.name, area.missions[row].name), state)
+                              for row in rows])
+        self.missionModel.rowsChanged(rows)
 
     def onSkillMenu(self, pos):
-        item = self.skillView.itemAt(pos)
-        if item is None or self.currentChar is None or self.currentArea is None:
+        rows = self.menuRows(self.skillView, pos)
+        if not rows or self.currentChar is None or self.currentArea is None:
             return
 
-        skillName = "Skill!{}::{}".format(self.currentArea.name, item.text(0))
-
         menu = QtWidgets.QMenu()
         noState = menu.addAction("(Clear)")
         unlockedState = menu.addAction("Unlocked")
         knownState = menu.addAction("Known")
-        action = menu.exec(self.questView.viewport().mapToGlobal(pos))
+        action = menu.exec(self.skillView.viewport().mapToGlobal(pos))
 
         if action == noState:
-            self.saveQuestState(skillName, "")
+            state = ""
         elif action == unlockedState:
-            self.saveQuestState(skillName, "Unlocked")
+            state = "Unlocked"
         elif action == knownState:
-            self.saveQuestState(skillName, "Known")
+            state = "Known"
+        else:
+            return
 
-        self.updateSkillStatus(item)
+        area = self.currentArea
+        self.saveQuestStates([(statusKey(STATUS_SKILL, area.name, area.skills[row].name), state)
+                              for row in rows])
+        self.skillModel.rowsChanged(rows)
 
     def onVanquishMenu(self, pos):
-        item = self.vanquishView.itemAt(pos)
-        if item is None or self.currentChar is None or self.currentArea is None:
+        rows = self.menuRows(self.vanquishView, pos)
+        if not rows or self.currentChar is None or self.currentArea is None:
             return
 
-        vqAreaName = "Vanquish!{}::{}".format(self.currentArea.name, item.text(0))
-
         menu = QtWidgets.QMenu()
         noState = menu.addAction("(Clear)")
         doneState = menu.addAction("Done")
-        action = menu.exec(self.questView.viewport().mapToGlobal(pos))
+        action = menu.exec(self.vanquishView.viewport().mapToGlobal(pos))
 
         if action == noState:
-            self.saveQuestState(vqAreaName, "")
+            state = ""
         elif action == doneState:
-            self.saveQuestState(vqAreaName, "Done")
+            state = "Done"
+        else:
+            return
 
-        self.updateVanquishStatus(item)
+        area = self.currentArea
+        self.saveQuestStates([(statusKey(STATUS_VANQUISH, area.name, area.areas[row].name), state)
+                              for row in rows])
+        self.vanquishModel.rowsChanged(rows)
 
 
 if __name__ == '__main__':
     locale.setlocale(locale.LC_ALL, '')
 
+    if not os.path.exists(DATA_BASE):
+        os.mkdir(DATA_BASE)
+
+    # Loaded before Qt and the GUI's threads start, since a large catalog
+    # is parsed in worker processes
+    cache = CatalogCache(os.path.join(DATA_BASE, 'catalog.cache'))
+    areas = loadCatalog(os.getcwd(), cache)
+
+    # Required for QtWebEngine to be imported after the application starts
+    QtCore.QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
     app = QtWidgets.QApplication(sys.argv)
     gui = TrackGui()
 
-    questList = os.listdir('quests')
-    for quest in questList:
-        if not quest.endswith('.yaml'):
-            continue
-
-        with open('quests/' + quest, 'rb') as qf:
-            info = yaml.safe_load(qf)
-        if 'Name' in info:
-            area_name = info['Name']
-        else:
-            area_name = quest.replace('.yaml', '')
-        gui.addArea(QuestArea(info, area_name))
+    for area in areas:
+        if isinstance(area, QuestArea):
+            gui.addArea(area)
     gui.areaView.sortItems(0, Qt.SortOrder.AscendingOrder)
+    for area in areas:
+        if not isinstance(area, QuestArea):
+            gui.addArea(area)
+    gui.searchIndex.prepare()
 
-    missionList = os.listdir('missions')
-    for mission in missionList:
-        if not mission.endswith('.yaml'):
-            continue
-
-        with open('missions/' + mission, 'rb') as mf:
-            info = yaml.safe_load(mf)
-        if 'Name' in info:
-            area_name = info['Name']
-        else:
-            area_name = mission.replace('.yaml', '')
-        gui.addArea(MissionArea(info, area_name))
-
-    skillList = os.listdir('skills')
-    for skill in skillList:
-        if not skill.endswith('.yaml'):
-            continue
-
-        with open('skills/' + skill, 'rb') as sf:
-            info = yaml.safe_load(sf)
-        if 'Name' in info:
-            area_name = info['Name']
-        else:
-            area_name = skill.replace('.yaml', '')
-        gui.addArea(SkillArea(info, area_name))
-
-    zvAreaList = os.listdir('vanquish')
-    for area in zvAreaList:
-        if not area.endswith('.yaml'):
-            continue
-
-        with open('vanquish/' + area, 'rb') as sf:
-            info = yaml.safe_load(sf)
-        if 'Name' in info:
-            area_name = info['Name']
-        else:
-            area_name = area.replace('.yaml', '')
-        gui.addArea(VanquishArea(info, area_name))
-
-    if not os.path.exists(DATA_BASE):
-        os.mkdir(DATA_BASE)
-    charList = os.listdir(DATA_BASE)
-    chars = []
-    for char in charList:
-        if not char.endswith('.db'):
-            continue
-
-        db = sqlite3.connect(os.path.join(DATA_BASE, char))
-        csr = db.cursor()
-        csr.execute("SELECT value FROM config WHERE key='Name'")
-        name = csr.fetchone()[0]
-        csr.execute("SELECT value FROM config WHERE key='Type'")
-        ctype = csr.fetchone()[0]
-        chars.append((name, ctype, char))
-    for char in sorted(chars, key=lambda c: c[0].lower()):
+    chars = listChars(DATA_BASE)
+    for char in chars:
         gui.addChar(char[0], char[1], char[2])
     if len(chars) > 0:
         gui.charSelect.setCurrentIndex(0)
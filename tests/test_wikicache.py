@@ -0,0 +1,274 @@
+import os
+import time
+import socket
+import shutil
+import tempfile
+import threading
+import unittest
+import http.server
+
+from gwdata.wikicache import WikiCache, WikiCacheError, WikiProxy, WikiPrefetcher
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        wiki = self.server.wiki
+        with wiki.lock:
+            wiki.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.path.startswith('/missing'):
+            self.send_error(404)
+            return
+        if self.path.startswith('/slow'):
+            time.sleep(0.5)
+        if self.path.startswith('/truncated'):
+            # Promises more than it sends, then drops the connection
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', '1000')
+            self.end_headers()
+            self.wfile.write(b'<html>')
+            return
+        etag = '"{}"'.format(wiki.version)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = wiki.body(self.path)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html' if self.path.startswith('/wiki/') else 'image/png')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Local stand-in for the wiki
+class StandInWiki(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super(StandInWiki, self).__init__(('127.0.0.1', 0), StandInHandler)
+        self.wiki = self
+        self.lock = threading.Lock()
+        self.requests = []
+        self.version = 1
+        self.size = 1000
+        self.thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    def url(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+    def body(self, path):
+        if path.startswith('/wiki/'):
+            return '<html><p>{} v{}</p></html>'.format(path, self.version).encode('utf-8')
+        return b'X' * self.size
+
+    def count(self, path):
+        with self.lock:
+            return sum(1 for reqPath, etag in self.requests if reqPath == path)
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class WikiCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cacheDir = tempfile.mkdtemp()
+        self.wiki = StandInWiki()
+        self.cache = WikiCache(self.cacheDir, self.wiki.url())
+        self.stopped = False
+
+    def tearDown(self):
+        self.cache.close()
+        if not self.stopped:
+            self.wiki.stop()
+        shutil.rmtree(self.cacheDir)
+
+    def goOffline(self):
+        self.wiki.stop()
+        self.stopped = True
+
+    def testCachedPageIsNotRefetched(self):
+        first = self.cache.get('/wiki/Page')
+        second = self.cache.get('/wiki/Page')
+        self.assertEqual(first, second)
+        self.assertEqual(self.wiki.count('/wiki/Page'), 1)
+
+    def testNotModifiedRevalidation(self):
+        contentType, body = self.cache.get('/wiki/Page')
+        fetched = self.cache.entries['/wiki/Page'].fetched
+        self.cache.maxAge = 0
+        self.assertEqual(self.cache.get('/wiki/Page'), (contentType, body))
+        self.assertEqual(self.wiki.requests[-1], ('/wiki/Page', '"1"'))
+        self.assertGreater(self.cache.entries['/wiki/Page'].fetched, fetched)
+
+    def testChangedPageIsReplaced(self):
+        self.cache.get('/wiki/Page')
+        self.cache.maxAge = 0
+        self.wiki.version = 2
+        self.assertIn(b'v2', self.cache.get('/wiki/Page')[1])
+
+    def testConcurrentRequestsShareFetch(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get('/slow/Page')))
+                   for idx in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(self.wiki.count('/slow/Page'), 1)
+        self.assertEqual(self.cache.fetchLocks, {})
+
+    def testFetchLocksAreReleased(self):
+        self.cache.get('/wiki/Page')
+        with self.assertRaises(WikiCacheError):
+            self.cache.get('/missing')
+        self.assertEqual(self.cache.fetchLocks, {})
+
+    def testEviction(self):
+        self.cache.maxBytes = 2500
+        for idx in range(4):
+            self.cache.get('/images/{}.png'.format(idx))
+        self.assertLessEqual(self.cache.totalSize, 2500)
+        self.assertEqual(sorted(self.cache.entries), ['/images/2.png', '/images/3.png'])
+        files = [name for dirPath, dirNames, fileNames in os.walk(self.cacheDir)
+                 for name in fileNames if len(name) == 40]
+        self.assertEqual(len(files), 2)
+
+    def testLeastRecentlyUsedIsEvicted(self):
+        self.cache.maxBytes = 2500
+        self.cache.get('/images/0.png')
+        self.cache.get('/images/1.png')
+        self.cache.get('/images/0.png')
+        self.cache.get('/images/2.png')
+        self.assertEqual(sorted(self.cache.entries), ['/images/0.png', '/images/2.png'])
+
+    def testStaleCopyWhenOffline(self):
+        contentType, body = self.cache.get('/wiki/Page')
+        self.goOffline()
+        self.cache.maxAge = 0
+        self.assertEqual(self.cache.get('/wiki/Page'), (contentType, body))
+
+    def testUncachedWhenOffline(self):
+        self.goOffline()
+        with self.assertRaises(WikiCacheError) as ctx:
+            self.cache.get('/wiki/Page')
+        self.assertEqual(ctx.exception.status, 502)
+
+    def testMissingPage(self):
+        with self.assertRaises(WikiCacheError) as ctx:
+            self.cache.get('/missing')
+        self.assertEqual(ctx.exception.status, 404)
+
+    def testTruncatedResponse(self):
+        with self.assertRaises(WikiCacheError) as ctx:
+            self.cache.get('/truncated')
+        self.assertEqual(ctx.exception.status, 502)
+        self.assertNotIn('/truncated', self.cache.entries)
+
+    def testStaleCopyWhenTruncated(self):
+        self.cache.get('/wiki/Page')
+        entry = self.cache.entries.pop('/wiki/Page')
+        self.cache.entries['/truncated'] = entry
+        self.cache.maxAge = 0
+        self.assertIn(b'/wiki/Page', self.cache.get('/truncated')[1])
+
+    def testPrefetchSurvivesTruncatedResponse(self):
+        prefetch = WikiPrefetcher(self.cache, workers=1)
+        prefetch.prefetch(['/truncated', '/wiki/After'])
+        waiter = threading.Thread(target=prefetch.wait, daemon=True)
+        waiter.start()
+        waiter.join(10)
+        self.assertFalse(waiter.is_alive())
+        self.assertTrue(self.cache.contains('/wiki/After'))
+        prefetch.shutdown()
+
+    def testPrefetchFetchesAssets(self):
+        self.wiki.body = lambda path: b'<html><img src="/images/a.png"></html>' \
+                if path.startswith('/wiki/') else b'X'
+        prefetch = WikiPrefetcher(self.cache)
+        prefetch.prefetch(['/wiki/Page'])
+        prefetch.wait()
+        self.assertTrue(self.cache.contains('/images/a.png'))
+        prefetch.shutdown()
+
+    def testCloseDuringFetch(self):
+        errors = []
+        hook = threading.excepthook
+        threading.excepthook = lambda args: errors.append(args.exc_value)
+        try:
+            prefetch = WikiPrefetcher(self.cache, workers=1)
+            prefetch.prefetch(['/slow/Page'])
+            time.sleep(0.1)
+            prefetch.shutdown(0.05)
+            self.cache.close()
+            prefetch.threads[0].join(5)
+        finally:
+            threading.excepthook = hook
+        self.assertFalse(prefetch.threads[0].is_alive())
+        self.assertEqual(errors, [])
+        self.assertFalse(self.cache.contains('/slow/Page'))
+
+    def testReopen(self):
+        self.cache.get('/wiki/Page')
+        self.cache.close()
+        self.cache = WikiCache(self.cacheDir, self.wiki.url())
+        self.assertTrue(self.cache.contains('/wiki/Page'))
+        self.cache.get('/wiki/Page')
+        self.assertEqual(self.wiki.count('/wiki/Page'), 1)
+
+    def testRejectsOtherHosts(self):
+        for path in ('@example.org/x', 'wiki/Page'):
+            with self.assertRaises(WikiCacheError) as ctx:
+                self.cache.get(path)
+            self.assertEqual(ctx.exception.status, 400)
+
+
+class WikiProxyTest(unittest.TestCase):
+    def setUp(self):
+        self.cacheDir = tempfile.mkdtemp()
+        self.wiki = StandInWiki()
+        self.cache = WikiCache(self.cacheDir, self.wiki.url())
+        self.proxy = WikiProxy(self.cache)
+        self.proxy.start()
+
+    def tearDown(self):
+        self.proxy.stop()
+        self.cache.close()
+        self.wiki.stop()
+        shutil.rmtree(self.cacheDir)
+
+    def rawGet(self, path):
+        with socket.create_connection(self.proxy.server_address, timeout=10) as conn:
+            conn.sendall("GET {} HTTP/1.0\r\n\r\n".format(path).encode('ascii'))
+            response = b''
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                response += data
+        head, sep, body = response.partition(b'\r\n\r\n')
+        return int(head.split()[1]), body
+
+    def testServesFromCache(self):
+        status, body = self.rawGet('/wiki/Page')
+        self.assertEqual(status, 200)
+        self.assertEqual(self.rawGet('/wiki/Page'), (status, body))
+        self.assertEqual(self.wiki.count('/wiki/Page'), 1)
+
+    def testPassesErrorsThrough(self):
+        self.assertEqual(self.rawGet('/missing')[0], 404)
+
+    def testRejectsOtherHosts(self):
+        self.assertEqual(self.rawGet('@example.org/x')[0], 400)
+        self.assertEqual(len(self.wiki.requests), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()